@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from kakuro.models import User, PuzzleTemplate, PuzzleInteraction, ScoreRecord, UserSession, Puzzle
 from kakuro.database import SessionLocal
 from kakuro.auth import hash_password
+import kakuro.template_stats as template_stats
 from datetime import datetime, timezone
 
 def get_db():
@@ -70,6 +71,8 @@ def reset_puzzles():
         })
         
         db.commit()
+        # Zero the admin overview's template totals
+        template_stats.refresh(db)
         print("Successfully reset the system. Puzzles cleared and user stats zeroed.")
     except Exception as e:
         db.rollback()
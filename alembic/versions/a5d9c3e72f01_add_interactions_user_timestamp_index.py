@@ -0,0 +1,37 @@
+"""add_interactions_user_timestamp_index
+
+Revision ID: a5d9c3e72f01
+Revises: f2c7e9a31b58
+Create Date: 2026-02-04 14:27:05.339862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d9c3e72f01'
+down_revision: Union[str, Sequence[str], None] = 'f2c7e9a31b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('puzzle_interactions')]
+
+    if 'ix_puzzle_interactions_user_timestamp' not in existing_indexes:
+        op.create_index(
+            'ix_puzzle_interactions_user_timestamp', 'puzzle_interactions',
+            ['user_id', sa.text('timestamp DESC')], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_puzzle_interactions_user_timestamp', table_name='puzzle_interactions')
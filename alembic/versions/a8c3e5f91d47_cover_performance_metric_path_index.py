@@ -0,0 +1,40 @@
+"""cover_performance_metric_path_index
+
+Revision ID: a8c3e5f91d47
+Revises: f5b8d2c47e19
+Create Date: 2026-02-06 11:37:05.912384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e5f91d47'
+down_revision: Union[str, Sequence[str], None] = 'f5b8d2c47e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('performance_metrics')]
+
+    if 'ix_performance_metrics_name_path' in existing_indexes:
+        op.drop_index('ix_performance_metrics_name_path', table_name='performance_metrics')
+    if 'ix_performance_metrics_name_path_ts' not in existing_indexes:
+        op.create_index(
+            'ix_performance_metrics_name_path_ts', 'performance_metrics',
+            ['metric_name', 'path', 'auth_status', 'timestamp', 'value'], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_performance_metrics_name_path_ts', table_name='performance_metrics')
+    op.create_index('ix_performance_metrics_name_path', 'performance_metrics', ['metric_name', 'path', 'auth_status'], unique=False)
@@ -0,0 +1,48 @@
+"""add_interaction_fill_bucket
+
+Revision ID: b2e6f0a94c18
+Revises: a8c3e5f91d47
+Create Date: 2026-02-06 14:02:53.477120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2e6f0a94c18'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e5f91d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_columns = [c['name'] for c in inspector.get_columns('puzzle_interactions')]
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('puzzle_interactions')]
+
+    if 'fill_bucket' not in existing_columns:
+        if bind.dialect.name == 'sqlite':
+            # SQLite can only add generated columns as VIRTUAL
+            op.execute("ALTER TABLE puzzle_interactions ADD COLUMN fill_bucket INTEGER GENERATED ALWAYS AS (fill_count / 2) VIRTUAL")
+        else:
+            op.add_column('puzzle_interactions', sa.Column('fill_bucket', sa.Integer(), sa.Computed('fill_count / 2', persisted=True)))
+
+    if 'ix_puzzle_interactions_action_bucket' not in existing_indexes:
+        op.create_index(
+            'ix_puzzle_interactions_action_bucket', 'puzzle_interactions',
+            ['action_type', 'fill_bucket', 'duration_ms'], unique=False,
+            sqlite_where=sa.text('duration_ms > 0'),
+            postgresql_where=sa.text('duration_ms > 0')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_puzzle_interactions_action_bucket', table_name='puzzle_interactions')
+    op.drop_column('puzzle_interactions', 'fill_bucket')
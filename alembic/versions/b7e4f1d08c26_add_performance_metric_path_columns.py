@@ -0,0 +1,58 @@
+"""add_performance_metric_path_columns
+
+Revision ID: b7e4f1d08c26
+Revises: a5d9c3e72f01
+Create Date: 2026-02-05 10:48:19.660417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4f1d08c26'
+down_revision: Union[str, Sequence[str], None] = 'a5d9c3e72f01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_columns = [c['name'] for c in inspector.get_columns('performance_metrics')]
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('performance_metrics')]
+
+    with op.batch_alter_table('performance_metrics', schema=None) as batch_op:
+        if 'path' not in existing_columns:
+            batch_op.add_column(sa.Column('path', sa.String(), nullable=True))
+        if 'auth_status' not in existing_columns:
+            batch_op.add_column(sa.Column('auth_status', sa.String(), nullable=True))
+
+    # Backfill from the JSON metadata
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE performance_metrics
+            SET path = metadata_json->>'path', auth_status = metadata_json->>'user_type'
+            WHERE path IS NULL
+        """)
+    else:
+        op.execute("""
+            UPDATE performance_metrics
+            SET path = json_extract(metadata_json, '$.path'), auth_status = json_extract(metadata_json, '$.user_type')
+            WHERE path IS NULL
+        """)
+
+    if 'ix_performance_metrics_name_path' not in existing_indexes:
+        op.create_index('ix_performance_metrics_name_path', 'performance_metrics', ['metric_name', 'path', 'auth_status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_performance_metrics_name_path', table_name='performance_metrics')
+    with op.batch_alter_table('performance_metrics', schema=None) as batch_op:
+        batch_op.drop_column('auth_status')
+        batch_op.drop_column('path')
@@ -0,0 +1,40 @@
+"""add_api_cache_table
+
+Revision ID: c3f8a2d61e97
+Revises: b7e4f1d08c26
+Create Date: 2026-02-06 16:20:53.118740
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d61e97'
+down_revision: Union[str, Sequence[str], None] = 'b7e4f1d08c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'api_cache' not in inspector.get_table_names():
+        op.create_table('api_cache',
+            sa.Column('key', sa.String(), nullable=False),
+            sa.Column('value', sa.LargeBinary(), nullable=False),
+            sa.Column('expires_at', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('key')
+        )
+        op.create_index(op.f('ix_api_cache_expires_at'), 'api_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_api_cache_expires_at'), table_name='api_cache')
+    op.drop_table('api_cache')
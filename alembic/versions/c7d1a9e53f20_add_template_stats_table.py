@@ -0,0 +1,41 @@
+"""add_template_stats_table
+
+Revision ID: c7d1a9e53f20
+Revises: b2e6f0a94c18
+Create Date: 2026-02-07 10:24:16.083551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d1a9e53f20'
+down_revision: Union[str, Sequence[str], None] = 'b2e6f0a94c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'template_stats' not in inspector.get_table_names():
+        op.create_table('template_stats',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('templates', sa.Integer(), nullable=False),
+            sa.Column('total_uses', sa.Integer(), nullable=False),
+            sa.Column('total_skips', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+    # The row itself is created on first read by template_stats.get()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('template_stats')
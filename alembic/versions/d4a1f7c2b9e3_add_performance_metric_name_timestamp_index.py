@@ -0,0 +1,36 @@
+"""add_performance_metric_name_timestamp_index
+
+Revision ID: d4a1f7c2b9e3
+Revises: c69187634699
+Create Date: 2026-02-03 18:42:11.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a1f7c2b9e3'
+down_revision: Union[str, Sequence[str], None] = 'c69187634699'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('performance_metrics')]
+
+    with op.batch_alter_table('performance_metrics', schema=None) as batch_op:
+        if 'ix_performance_metrics_name_timestamp' not in existing_indexes:
+            batch_op.create_index('ix_performance_metrics_name_timestamp', ['metric_name', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('performance_metrics', schema=None) as batch_op:
+        batch_op.drop_index('ix_performance_metrics_name_timestamp')
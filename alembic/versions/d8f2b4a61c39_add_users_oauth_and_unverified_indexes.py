@@ -0,0 +1,52 @@
+"""add_users_oauth_and_unverified_indexes
+
+Revision ID: d8f2b4a61c39
+Revises: c7d1a9e53f20
+Create Date: 2026-02-07 10:41:18.630254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2b4a61c39'
+down_revision: Union[str, Sequence[str], None] = 'c7d1a9e53f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_indexes(existing_indexes, **kw) -> None:
+    if 'ix_users_oauth_provider_oauth_id' not in existing_indexes:
+        op.create_index('ix_users_oauth_provider_oauth_id', 'users', ['oauth_provider', 'oauth_id'], unique=False, **kw)
+
+    if 'ix_users_unverified' not in existing_indexes:
+        op.create_index(
+            'ix_users_unverified', 'users', ['email'], unique=False,
+            sqlite_where=sa.text('email_verified = 0'),
+            postgresql_where=sa.text('email_verified = false'),
+            **kw
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('users')]
+
+    if bind.dialect.name == 'postgresql':
+        # Build without locking users against writes; CONCURRENTLY can't run in a transaction
+        with op.get_context().autocommit_block():
+            _create_indexes(existing_indexes, postgresql_concurrently=True)
+    else:
+        _create_indexes(existing_indexes)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_unverified', table_name='users')
+    op.drop_index('ix_users_oauth_provider_oauth_id', table_name='users')
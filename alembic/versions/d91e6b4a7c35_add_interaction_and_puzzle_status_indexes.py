@@ -0,0 +1,47 @@
+"""add_interaction_and_puzzle_status_indexes
+
+Revision ID: d91e6b4a7c35
+Revises: c3f8a2d61e97
+Create Date: 2026-02-07 12:34:41.902567
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91e6b4a7c35'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a2d61e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    interaction_indexes = [idx['name'] for idx in inspector.get_indexes('puzzle_interactions')]
+    puzzle_indexes = [idx['name'] for idx in inspector.get_indexes('puzzles')]
+
+    if 'ix_puzzle_interactions_puzzle_timestamp' not in interaction_indexes:
+        op.create_index('ix_puzzle_interactions_puzzle_timestamp', 'puzzle_interactions', ['puzzle_id', 'timestamp'], unique=False)
+
+    if 'ix_puzzle_interactions_action_duration' not in interaction_indexes:
+        op.create_index(
+            'ix_puzzle_interactions_action_duration', 'puzzle_interactions', ['action_type', 'duration_ms'], unique=False,
+            sqlite_where=sa.text("duration_ms > 0"),
+            postgresql_where=sa.text("duration_ms > 0")
+        )
+
+    if 'ix_puzzles_status_difficulty' not in puzzle_indexes:
+        op.create_index('ix_puzzles_status_difficulty', 'puzzles', ['status', 'difficulty'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_puzzles_status_difficulty', table_name='puzzles')
+    op.drop_index('ix_puzzle_interactions_action_duration', table_name='puzzle_interactions')
+    op.drop_index('ix_puzzle_interactions_puzzle_timestamp', table_name='puzzle_interactions')
@@ -0,0 +1,54 @@
+"""add_performance_metric_rollups
+
+Revision ID: e4a7b9c25d10
+Revises: d91e6b4a7c35
+Create Date: 2026-02-08 15:11:27.845203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7b9c25d10'
+down_revision: Union[str, Sequence[str], None] = 'd91e6b4a7c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'performance_metric_rollups' not in inspector.get_table_names():
+        op.create_table('performance_metric_rollups',
+            sa.Column('metric_name', sa.String(), nullable=False),
+            sa.Column('bucket_ts', sa.DateTime(), nullable=False),
+            sa.Column('sum', sa.Float(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('metric_name', 'bucket_ts')
+        )
+    elif bind.execute(sa.text("SELECT 1 FROM performance_metric_rollups LIMIT 1")).first() is not None:
+        return
+
+    # Backfill from the raw samples already collected
+    if bind.dialect.name == 'postgresql':
+        bucket = "date_trunc('minute', timestamp)"
+    else:
+        bucket = "strftime('%Y-%m-%d %H:%M:00.000000', timestamp)"
+    op.execute(f"""
+        INSERT INTO performance_metric_rollups (metric_name, bucket_ts, sum, count)
+        SELECT metric_name, {bucket}, SUM(value), COUNT(*)
+        FROM performance_metrics
+        WHERE metric_name IN ('system_cpu_percent', 'system_memory_percent')
+        GROUP BY metric_name, {bucket}
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('performance_metric_rollups')
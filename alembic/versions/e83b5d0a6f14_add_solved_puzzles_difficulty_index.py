@@ -0,0 +1,38 @@
+"""add_solved_puzzles_difficulty_index
+
+Revision ID: e83b5d0a6f14
+Revises: d4a1f7c2b9e3
+Create Date: 2026-02-04 09:15:37.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e83b5d0a6f14'
+down_revision: Union[str, Sequence[str], None] = 'd4a1f7c2b9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('puzzles')]
+
+    if 'ix_puzzles_solved_difficulty' not in existing_indexes:
+        op.create_index(
+            'ix_puzzles_solved_difficulty', 'puzzles', ['difficulty'], unique=False,
+            sqlite_where=sa.text("status = 'solved'"),
+            postgresql_where=sa.text("status = 'solved'")
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_puzzles_solved_difficulty', table_name='puzzles')
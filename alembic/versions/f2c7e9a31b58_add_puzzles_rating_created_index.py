@@ -0,0 +1,37 @@
+"""add_puzzles_rating_created_index
+
+Revision ID: f2c7e9a31b58
+Revises: e83b5d0a6f14
+Create Date: 2026-02-04 11:02:48.771320
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7e9a31b58'
+down_revision: Union[str, Sequence[str], None] = 'e83b5d0a6f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('puzzles')]
+
+    if 'ix_puzzles_rating_created' not in existing_indexes:
+        op.create_index(
+            'ix_puzzles_rating_created', 'puzzles',
+            [sa.text('rating DESC'), sa.text('created_at DESC')], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_puzzles_rating_created', table_name='puzzles')
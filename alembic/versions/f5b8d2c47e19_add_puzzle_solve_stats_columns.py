@@ -0,0 +1,57 @@
+"""add_puzzle_solve_stats_columns
+
+Revision ID: f5b8d2c47e19
+Revises: e4a7b9c25d10
+Create Date: 2026-02-06 09:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b8d2c47e19'
+down_revision: Union[str, Sequence[str], None] = 'e4a7b9c25d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_columns = [c['name'] for c in inspector.get_columns('puzzles')]
+
+    with op.batch_alter_table('puzzles', schema=None) as batch_op:
+        if 'solve_seconds' not in existing_columns:
+            batch_op.add_column(sa.Column('solve_seconds', sa.Float(), nullable=True))
+        if 'solve_moves' not in existing_columns:
+            batch_op.add_column(sa.Column('solve_moves', sa.Integer(), nullable=True))
+
+    # Backfill solved puzzles from their first/last solving interaction
+    if bind.dialect.name == 'postgresql':
+        span = "extract(epoch from max(timestamp) - min(timestamp))"
+    else:
+        span = "(julianday(max(timestamp)) - julianday(min(timestamp))) * 86400.0"
+    op.execute(f"""
+        UPDATE puzzles
+        SET solve_seconds = t.seconds, solve_moves = t.moves
+        FROM (
+            SELECT puzzle_id, {span} AS seconds, count(id) AS moves
+            FROM puzzle_interactions
+            WHERE action_type IN ('INPUT', 'DELETE', 'NOTE_ADD', 'NOTE_REMOVE')
+            GROUP BY puzzle_id
+        ) AS t
+        WHERE puzzles.id = t.puzzle_id AND puzzles.status = 'solved'
+          AND t.moves >= 2 AND t.seconds > 0 AND puzzles.solve_seconds IS NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('puzzles', schema=None) as batch_op:
+        batch_op.drop_column('solve_moves')
+        batch_op.drop_column('solve_seconds')
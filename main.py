@@ -3,6 +3,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.datastructures import Headers
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import func, select, desc, case, cast, Float
@@ -30,14 +31,16 @@ class BookSettings(BaseModel):
 import kakuro.storage as storage
 from kakuro.database import init_db, get_db
 from kakuro.models import User, Puzzle, PuzzleTemplate, generate_short_id, ScoreRecord
-from kakuro.auth import get_current_user, get_required_user, get_current_user_and_session
-from kakuro.analytics import log_interaction
-from kakuro.routes.auth_routes import router as auth_router, limiter
-from kakuro.routes.admin_routes import router as admin_router
+from kakuro.auth import get_current_user, get_required_user, get_current_user_and_session, decode_token
+from kakuro.analytics import log_interaction, record_solve_stats
+from kakuro.routes.auth_routes import router as auth_router, limiter, invalidate_user_profile
+from kakuro.routes.admin_routes import router as admin_router, warm_dashboard_cache
 from kakuro.generator_service import generator_service
 import kakuro.config as config
-from kakuro.performance import Timer, log_system_performance, record_metric
+from kakuro.performance import Timer, log_system_performance, record_metric, start_metric_flusher, flush_metrics
 import kakuro.performance as performance
+import kakuro.api_cache as api_cache
+import kakuro.template_stats as template_stats
 import kakuro.generate_book as book_gen
 import io
 
@@ -78,13 +81,32 @@ app.add_middleware(
 app.state.limiter = limiter
 app.add_exception_handler(429, _rate_limit_exceeded_handler)
 
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    return response
+# The middlewares below are plain ASGI callables rather than @app.middleware("http"):
+# BaseHTTPMiddleware adds a task group and an extra response stream hop to every request.
+SECURITY_HEADERS = [
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+]
+
+class SecurityHeadersMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                names = {name for name, _ in SECURITY_HEADERS}
+                headers = [h for h in message.get("headers", []) if h[0].lower() not in names]
+                message["headers"] = headers + SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+app.add_middleware(SecurityHeadersMiddleware)
 
 # Trust proxy headers (e.g., X-Forwarded-Proto) from local proxy
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["127.0.0.1", "::1"])
@@ -94,69 +116,69 @@ app.include_router(auth_router)
 # Include admin routes
 app.include_router(admin_router)
 
-@app.middleware("http")
-async def performance_middleware(request: Request, call_next):
+class PerformanceMiddleware:
     """
     Middleware to track request duration and active request count.
     """
-    import time
-    from kakuro.database import SessionLocal
-    from kakuro.auth import decode_token # Assuming you have this helper
-    from kakuro.models import User
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # 1. Skip tracking for static files (prevents DB bloat and saves performance)
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith("/static") or path == "/favicon.ico":
+            return await self.app(scope, receive, send)
+
+        # Increment active requests
+        performance.request_started()
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_tracking_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-    # 1. Skip tracking for static files (prevents DB bloat and saves performance)
-    if request.url.path.startswith("/static") or request.url.path == "/favicon.ico":
-        return await call_next(request)
+        try:
+            await self.app(scope, receive, send_tracking_status)
+            duration = (time.perf_counter() - start_time) * 1000 # ms
+
+            # Log metric (only buffered; the metric flusher writes it to the DB)
+            # The user stamp comes straight from the token, so no User lookup is needed
+            stamp = performance.user_meta(None)
+            auth_header = Headers(scope=scope).get("Authorization")
 
-    
-    # Increment active requests
-    performance.ACTIVE_REQUESTS += 1
-    start_time = time.perf_counter()
-    
-    try:
-        response = await call_next(request)
-        duration = (time.perf_counter() - start_time) * 1000 # ms
-        
-        # Log metric (we do this in a background-ish way or just quickly)
-        # To avoid blocking the response, we could use BackgroundTasks, but here we'll just do it simply
-        # or skip if it's too much overhead. For now, let's log everything.
-        with SessionLocal() as db:
-            current_user = None
-            auth_header = request.headers.get("Authorization")
-            
             if auth_header and auth_header.startswith("Bearer "):
                 try:
                     token = auth_header.split(" ")[1]
-                    # We only need the user ID to differentiate, no need for full auth logic
-                    
-                    payload = decode_token(token) 
+                    payload = decode_token(token)
                     user_id = payload.get("sub") if payload else None
                     if user_id:
-                        current_user = db.query(User).filter(User.id == user_id).first()
+                        stamp = {"user_type": "authenticated", "user_id": user_id}
                 except Exception:
                     # Token might be expired or invalid; treat as anonymous
                     pass
 
-            # 3. Record the metric with the User object
-            # This will now automatically set 'auth_status' in your metadata
-            scheme = request.url.scheme
+            # Read after the inner app ran: ProxyHeadersMiddleware rewrites the scheme in place
+            scheme = scope.get("scheme", "http")
             record_metric(
-                db, 
-                "api_request_duration_ms", 
-                duration, 
-                "ms", 
+                None,
+                "api_request_duration_ms",
+                duration,
+                "ms",
                 {
-                    "path": request.url.path, 
-                    "method": request.method,
-                    "status_code": response.status_code,
+                    "path": path,
+                    "method": scope["method"],
+                    "status_code": status_code,
                     "secure": scheme == "https"
                 },
-                user=current_user
+                stamp=stamp
             )
-        
-        return response
-    finally:
-        performance.ACTIVE_REQUESTS -= 1
+        finally:
+            performance.request_finished()
+
+app.add_middleware(PerformanceMiddleware)
 
 def system_monitor_task():
     """Background task to log system metrics every 60 seconds."""
@@ -166,6 +188,12 @@ def system_monitor_task():
             log_system_performance(SessionLocal)
         except Exception as e:
             logger.error(f"Error in system monitor task: {e}")
+        try:
+            with SessionLocal() as db:
+                api_cache.purge_expired(db)
+                warm_dashboard_cache(db)
+        except Exception as e:
+            logger.error(f"Error in cache maintenance: {e}")
         time.sleep(60)
 
 
@@ -193,6 +221,24 @@ def startup_event():
             if "short_id" not in columns:
                 logger.info("Migrating database: Adding short_id to puzzles table")
                 conn.execute(text("ALTER TABLE puzzles ADD COLUMN short_id TEXT"))
+            if "solve_seconds" not in columns:
+                logger.info("Migrating database: Adding solve_seconds/solve_moves to puzzles table")
+                conn.execute(text("ALTER TABLE puzzles ADD COLUMN solve_seconds FLOAT"))
+                conn.execute(text("ALTER TABLE puzzles ADD COLUMN solve_moves INTEGER"))
+                if "puzzle_interactions" in table_names:
+                    conn.execute(text("""
+                        UPDATE puzzles
+                        SET solve_seconds = (t.last_ts - t.first_ts) * 86400.0, solve_moves = t.moves
+                        FROM (
+                            SELECT puzzle_id, julianday(min(timestamp)) AS first_ts,
+                                   julianday(max(timestamp)) AS last_ts, count(id) AS moves
+                            FROM puzzle_interactions
+                            WHERE action_type IN ('INPUT', 'DELETE', 'NOTE_ADD', 'NOTE_REMOVE')
+                            GROUP BY puzzle_id
+                        ) AS t
+                        WHERE puzzles.id = t.puzzle_id AND puzzles.status = 'solved'
+                          AND t.moves >= 2 AND t.last_ts > t.first_ts
+                    """))
         
         if "users" in table_names:
             columns = [c["name"] for c in inspector.get_columns("users")]
@@ -205,6 +251,10 @@ def startup_event():
             if "fill_count" not in columns:
                 logger.info("Migrating database: Adding fill_count to puzzle_interactions table")
                 conn.execute(text("ALTER TABLE puzzle_interactions ADD COLUMN fill_count INTEGER"))
+            if "fill_bucket" not in columns:
+                # SQLite can only add generated columns as VIRTUAL
+                logger.info("Migrating database: Adding fill_bucket to puzzle_interactions table")
+                conn.execute(text("ALTER TABLE puzzle_interactions ADD COLUMN fill_bucket INTEGER GENERATED ALWAYS AS (fill_count / 2) VIRTUAL"))
 
         if "users" in table_names:
             columns = [c["name"] for c in inspector.get_columns("users")]
@@ -258,12 +308,56 @@ def startup_event():
             for d in ["very_easy", "easy", "medium", "hard"]:
                 conn.execute(text("INSERT INTO difficulty_stats (difficulty, sum_scores, count) VALUES (:d, 0.0, 0)"), {"d": d})
 
+        if "performance_metrics" in table_names:
+            columns = [c["name"] for c in inspector.get_columns("performance_metrics")]
+            if "path" not in columns:
+                logger.info("Migrating database: Adding path/auth_status to performance_metrics table")
+                conn.execute(text("ALTER TABLE performance_metrics ADD COLUMN path TEXT"))
+                conn.execute(text("ALTER TABLE performance_metrics ADD COLUMN auth_status TEXT"))
+                conn.execute(text("""
+                    UPDATE performance_metrics
+                    SET path = json_extract(metadata_json, '$.path'),
+                        auth_status = json_extract(metadata_json, '$.user_type')
+                """))
+
+        # Composite indexes used by the admin dashboard queries
+        if "users" in table_names:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_oauth_provider_oauth_id ON users(oauth_provider, oauth_id)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_unverified ON users(email) WHERE email_verified = 0"))
+        if "performance_metrics" in table_names:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_performance_metrics_name_timestamp ON performance_metrics(metric_name, timestamp)"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_performance_metrics_name_path"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_performance_metrics_name_path_ts ON performance_metrics(metric_name, path, auth_status, timestamp, value)"))
+            # init_db creates the rollup table empty; seed it from the raw samples once
+            if "performance_metric_rollups" in table_names and conn.execute(text("SELECT 1 FROM performance_metric_rollups LIMIT 1")).first() is None:
+                logger.info("Migrating database: Backfilling performance_metric_rollups")
+                conn.execute(text("""
+                    INSERT INTO performance_metric_rollups (metric_name, bucket_ts, sum, count)
+                    SELECT metric_name, strftime('%Y-%m-%d %H:%M:00.000000', timestamp), SUM(value), COUNT(*)
+                    FROM performance_metrics
+                    WHERE metric_name IN ('system_cpu_percent', 'system_memory_percent')
+                    GROUP BY metric_name, strftime('%Y-%m-%d %H:%M:00.000000', timestamp)
+                """))
+        if "puzzles" in table_names:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzles_solved_difficulty ON puzzles(difficulty) WHERE status = 'solved'"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzles_rating_created ON puzzles(rating DESC, created_at DESC)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzles_status_difficulty ON puzzles(status, difficulty)"))
+        if "puzzle_interactions" in table_names:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzle_interactions_user_timestamp ON puzzle_interactions(user_id, timestamp DESC)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzle_interactions_puzzle_timestamp ON puzzle_interactions(puzzle_id, timestamp)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzle_interactions_action_duration ON puzzle_interactions(action_type, duration_ms) WHERE duration_ms > 0"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_puzzle_interactions_action_bucket ON puzzle_interactions(action_type, fill_bucket, duration_ms) WHERE duration_ms > 0"))
+
         conn.commit()
     logger.info("Database initialized")
     
     # Start background generator
     generator_service.start(DIFFICULTY_SIZE_RANGES)
     
+    # Start metric flusher (record_metric/log_auth_attempt only buffer rows)
+    from python.database import SessionLocal
+    start_metric_flusher(SessionLocal)
+
     # Start system monitor
     threading.Thread(target=system_monitor_task, daemon=True).start()
 
@@ -272,6 +366,15 @@ def shutdown_event():
     """Stop background services."""
     generator_service.stop()
 
+    # Write out any buffered metrics before exiting
+    from python.database import SessionLocal
+    with SessionLocal() as db:
+        flush_metrics(db)
+
+    # Close the keep-alive connection to Resend
+    from python.email_service import close_email_client
+    close_email_client()
+
 def get_base_path():
     if getattr(sys, 'frozen', False):
         # We are running in a bundle (e.g., PyInstaller)
@@ -438,6 +541,7 @@ def skip_puzzle(
     template = db.query(PuzzleTemplate).filter(PuzzleTemplate.id == request.template_id).first()
     if template:
         template.times_skipped = (template.times_skipped or 0) + 1
+        template_stats.bump(db, skips=1)
         db.commit()
 
         # Log interaction if user is logged in and puzzle_id is available
@@ -544,12 +648,14 @@ def save_puzzle_endpoint(
                         grid=request.grid,
                     )
                     db.add(new_template)
+                    template_stats.bump(db, templates=1)
                     db.flush() # get id
                     puzzle.template_id = new_template.id
                 
                 db.add(puzzle)
             
             if is_new_solve:
+                record_solve_stats(db, puzzle)
                 points = DIFFICULTY_POINTS.get(request.difficulty, 0)
                 db.execute(
                     update(User)
@@ -569,7 +675,11 @@ def save_puzzle_endpoint(
                 )
                 db.add(score_record)
             
+            user_id = current_user.id  # read before the commit expires it
             db.commit()
+            if is_new_solve:
+                # /auth/me shows the solve count and score
+                invalidate_user_profile(user_id)
         else:
             # check if puzzle exists in DB even for anonymous users (e.g. from QR code)
             existing_puzzle = db.query(Puzzle).filter(Puzzle.id == request.id).first()
@@ -590,6 +700,8 @@ def save_puzzle_endpoint(
                  # Optional: Save their grid too?
                  existing_puzzle.grid = request.grid 
                  existing_puzzle.user_grid = request.userGrid
+                 if request.status == "solved" and existing_puzzle.status != "solved":
+                     record_solve_stats(db, existing_puzzle)
                  existing_puzzle.status = request.status
                  
                  db.commit()
@@ -629,6 +741,7 @@ def save_puzzle_endpoint(
                         difficulty_data={}
                     )
                     db.add(new_template)
+                    template_stats.bump(db, templates=1)
                     db.flush()
                     new_puzzle.template_id = new_template.id
 
@@ -824,6 +937,7 @@ def fetch_new_puzzles_from_pool(db: Session, current_user: Optional[User], diffi
     
     # Commit the times_used increments
     if existing_templates:
+        template_stats.bump(db, uses=len(existing_templates))
         db.commit()
     
     # 2. GENERATE FALLBACK if pool is empty or user exhausted it
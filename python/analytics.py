@@ -2,16 +2,19 @@
 Analytics service for tracking user sessions and puzzle interactions.
 """
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from fastapi import Request
-from .models import UserSession, PuzzleInteraction, Puzzle
+from .models import UserSession, PuzzleInteraction, Puzzle, generate_uuid
 from .kakuro import KakuroBoard # Needed to check correctness if required
 
-def start_user_session(db: Session, user_id: str, request: Request, device_type: str = "desktop") -> UserSession:
+def start_user_session(db: Session, user_id: str, request: Request, device_type: str = "desktop", now: Optional[datetime] = None) -> UserSession:
     """
     Creates a new user session record upon login.
     Parses User-Agent and IP from the request.
+    The session is only added; the caller commits it together with its own
+    login changes (last_login etc.), so a login is a single transaction.
     """
     user_agent = request.headers.get("user-agent", "")
     client_ip = request.client.host if request.client else None
@@ -31,20 +34,20 @@ def start_user_session(db: Session, user_id: str, request: Request, device_type:
     elif "Safari" in user_agent and "Chrome" not in user_agent: browser_name = "Safari"
     elif "Edg" in user_agent: browser_name = "Edge"
 
+    now = now or datetime.now(timezone.utc)
     session = UserSession(
+        id=generate_uuid(),  # known up front, no refresh needed to read it back
         user_id=user_id,
         ip_address=client_ip,
         user_agent=user_agent,
         device_type=device_type,
         os=os_name,
         browser=browser_name,
-        login_at=datetime.now(timezone.utc),
-        last_activity_at=datetime.now(timezone.utc)
+        login_at=now,
+        last_activity_at=now
     )
     
     db.add(session)
-    db.commit()
-    db.refresh(session)
     return session
 
 def end_user_session(db: Session, session_id: str):
@@ -55,6 +58,27 @@ def end_user_session(db: Session, session_id: str):
         session.last_activity_at = datetime.now(timezone.utc)
         db.commit()
 
+# Interactions that count as solving moves for the solve-time stats
+SOLVE_ACTIONS = ("INPUT", "DELETE", "NOTE_ADD", "NOTE_REMOVE")
+
+def record_solve_stats(db: Session, puzzle: Puzzle):
+    """
+    Stores solve_seconds/solve_moves on a puzzle that just became solved.
+    Needs at least two solving moves spread over time, otherwise the stats stay NULL.
+    """
+    first, last, moves = db.query(
+        func.min(PuzzleInteraction.timestamp),
+        func.max(PuzzleInteraction.timestamp),
+        func.count(PuzzleInteraction.id)
+    ).filter(
+        PuzzleInteraction.puzzle_id == puzzle.id,
+        PuzzleInteraction.action_type.in_(SOLVE_ACTIONS)
+    ).one()
+
+    if moves >= 2 and first and last and last > first:
+        puzzle.solve_seconds = (last - first).total_seconds()
+        puzzle.solve_moves = moves
+
 def log_interaction(
     db: Session, 
     user_id: Optional[str], 
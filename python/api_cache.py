@@ -0,0 +1,132 @@
+"""
+SQLite-backed response cache for the admin dashboard.
+Endpoints decorated with `cached_sqlite` serve stored results until they expire.
+Only one thread recomputes a given entry at a time; while it does, concurrent
+callers get the expired (stale) value instead of piling onto the same query.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Any, Callable, Optional
+import functools
+import hashlib
+import inspect
+import logging
+import threading
+import time
+import orjson
+from .models import ApiCache
+
+logger = logging.getLogger("api_cache")
+
+# Arguments that never change the response (dependencies, not query params)
+_IGNORED_ARGS = {"db", "admin", "request", "response"}
+
+# Expired entries are kept this long so they can still be served stale
+STALE_GRACE_SECONDS = 3600
+
+# Striped locks, so only one caller recomputes an entry; a fixed pool keeps memory
+# bounded however many distinct keys (query parameter combinations) show up
+LOCK_STRIPES = 64
+_KEY_LOCKS = tuple(threading.Lock() for _ in range(LOCK_STRIPES))
+
+def _lock_for(key: str) -> threading.Lock:
+    return _KEY_LOCKS[hash(key) % LOCK_STRIPES]
+
+def get_cached(db: Session, key: str) -> Optional[Any]:
+    """Returns the decoded cached value, or None if missing or expired."""
+    value = db.execute(
+        select(ApiCache.value).where(ApiCache.key == key, ApiCache.expires_at > int(time.time()))
+    ).scalar()
+    return orjson.loads(value) if value is not None else None
+
+def get_cached_entry(db: Session, key: str) -> Optional[tuple]:
+    """Returns (decoded value, expires_at) even if expired, or None if missing."""
+    row = db.execute(select(ApiCache.value, ApiCache.expires_at).where(ApiCache.key == key)).first()
+    return (orjson.loads(row.value), row.expires_at) if row is not None else None
+
+def set_cached(db: Session, key: str, value: Any, ttl: int):
+    """Stores a JSON-serializable value for `ttl` seconds."""
+    row = {"key": key, "value": orjson.dumps(value), "expires_at": int(time.time()) + ttl}
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            stmt = sqlite_insert(ApiCache).values(**row)
+            db.execute(stmt.on_conflict_do_update(index_elements=[ApiCache.key], set_=row))
+        else:
+            db.merge(ApiCache(**row))
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Failed to cache {key}: {e}")
+        db.rollback()
+
+def purge_expired(db: Session) -> int:
+    """Deletes entries expired for longer than STALE_GRACE_SECONDS. Returns the number of rows removed."""
+    result = db.execute(delete(ApiCache).where(ApiCache.expires_at < int(time.time()) - STALE_GRACE_SECONDS))
+    db.commit()
+    return result.rowcount
+
+def cached_sqlite(ttl: int) -> Callable:
+    """
+    Cache-aside decorator for sync endpoints taking a `db` session.
+    The key is the endpoint name plus its query parameters (defaults filled in).
+    The wrapper gets a `refresh_ahead(db, window, **params)` helper for warming entries.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def make_key(kwargs) -> str:
+            bound = signature.bind_partial(**kwargs)
+            bound.apply_defaults()
+            params = sorted((k, v) for k, v in bound.arguments.items() if k not in _IGNORED_ARGS)
+            return f"{func.__name__}:" + hashlib.sha1(repr(params).encode()).hexdigest()
+
+        def compute(key: str, kwargs):
+            result = func(**kwargs)
+            set_cached(kwargs["db"], key, result, ttl)
+            return result
+
+        @functools.wraps(func)
+        def wrapper(**kwargs):
+            db: Session = kwargs["db"]
+            key = make_key(kwargs)
+
+            entry = get_cached_entry(db, key)
+            if entry is not None and entry[1] > time.time():
+                return entry[0]
+
+            lock = _lock_for(key)
+            if entry is not None:
+                # Stale: someone is already recomputing, serve the old value meanwhile
+                if not lock.acquire(blocking=False):
+                    return entry[0]
+            else:
+                lock.acquire()
+                # Another caller may have filled it while we waited
+                cached = get_cached(db, key)
+                if cached is not None:
+                    lock.release()
+                    return cached
+            try:
+                return compute(key, kwargs)
+            finally:
+                lock.release()
+
+        def refresh_ahead(db: Session, window: int, **params) -> bool:
+            """Recomputes an entry that exists and expires within `window` seconds. Returns True if it did."""
+            kwargs = {"db": db, "admin": None, **params}
+            key = make_key(kwargs)
+            entry = get_cached_entry(db, key)
+            if entry is None or entry[1] > time.time() + window:
+                return False
+            lock = _lock_for(key)
+            if not lock.acquire(blocking=False):
+                return False
+            try:
+                compute(key, kwargs)
+                return True
+            finally:
+                lock.release()
+
+        wrapper.refresh_ahead = refresh_ahead
+        return wrapper
+    return decorator
@@ -4,7 +4,7 @@ Handles password hashing, JWT token management, email verification, and password
 """
 
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -16,18 +16,21 @@ import kakuro.config as config
 import random
 import string
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 # HTTP Bearer token scheme
 security = HTTPBearer(auto_error=False)
 
+import anyio
 import bcrypt
 
 # Hash a password using bcrypt
 def hash_password(password: str) -> str:
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)
     hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
     return hashed_password.decode('utf-8')  # Return as string for DB storage
 
@@ -37,6 +40,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     hashed_byte_enc = hashed_password.encode('utf-8')  # Convert stored string back to bytes
     return bcrypt.checkpw(password=password_byte_enc, hashed_password=hashed_byte_enc)
 
+# True if a stored hash was made with a different work factor than BCRYPT_ROUNDS
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$12$<salt+hash>; the second field is the cost
+    parts = hashed_password.split("$")
+    return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != config.BCRYPT_ROUNDS
+
+# bcrypt holds the CPU for a few hundred ms per call; async routes await these
+# so the hash runs in the worker threadpool instead of stalling the event loop
+async def ahash_password(password: str) -> str:
+    return await anyio.to_thread.run_sync(hash_password, password)
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await anyio.to_thread.run_sync(verify_password, plain_password, hashed_password)
+
 
 def generate_verification_code(length: int = 6) -> str:
     """Generate a numeric verification code."""
@@ -212,6 +229,46 @@ def get_current_user_and_session(
     user = db.query(User).filter(User.id == user_id).first()
     return user, session_id
 
+# /auth/me runs on every page load; serve the profile dict from memory
+# for a short while instead of loading the User row each time
+PROFILE_CACHE_TTL_SECONDS = 60.0
+PROFILE_CACHE_MAX_ENTRIES = 10_000
+_profile_cache: Dict[str, Tuple[float, dict]] = {}
+_profile_lock = threading.Lock()
+
+def _cached_profile(db: Session, user_id: str) -> Optional[dict]:
+    now = time.monotonic()
+    entry = _profile_cache.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    user = db.get(User, user_id)
+    if not user:
+        return None
+    profile = user.to_dict()
+    with _profile_lock:
+        if user_id not in _profile_cache and len(_profile_cache) >= PROFILE_CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order: drop the oldest entry
+            _profile_cache.pop(next(iter(_profile_cache)), None)
+        _profile_cache[user_id] = (now + PROFILE_CACHE_TTL_SECONDS, profile)
+    return profile
+
+def invalidate_user_profile(user_id: str):
+    """Drops a cached profile after the user's row changed (login, verification, logout, solve stats)."""
+    _profile_cache.pop(user_id, None)
+
+def get_token_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> Optional[dict]:
+    """
+    Decodes the bearer token without touching the database.
+    Returns the claims, or None if no valid token is provided.
+    """
+    if not credentials:
+        return None
+    payload = decode_token(credentials.credentials)
+    return payload if payload and payload.get("sub") else None
+
 def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
@@ -279,4 +336,39 @@ def get_required_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
\ No newline at end of file
+    return user
+
+
+def get_required_profile(
+    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Like get_required_user, but returns the (cached) User.to_dict() profile.
+    Raises 401 Unauthorized if no valid token is provided.
+    """
+    payload = decode_token(credentials.credentials)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    profile = _cached_profile(db, user_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return profile
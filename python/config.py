@@ -45,10 +45,19 @@ GOOGLE_REDIRECT_URI = f"{APP_HOST}/auth/google/callback"
 FACEBOOK_REDIRECT_URI = f"{APP_HOST}/auth/facebook/callback"
 APPLE_REDIRECT_URI = f"{APP_HOST}/auth/apple/callback"
 
+# Performance monitoring
+# Disable to stop the periodic system/pool metric logging entirely
+SYSTEM_METRICS_ENABLED = os.getenv("SYSTEM_METRICS_ENABLED", "True").lower() == "true"
+
 # Email Configuration (Resend)
 RESEND_API_KEY: Optional[str] = os.getenv("RESEND_API_KEY")
 RESEND_FROM_EMAIL: str = os.getenv("RESEND_FROM_EMAIL", "Kakuro Generator <onboarding@kakurogenerator.com>")
 
+# Password hashing
+# bcrypt work factor; 12 takes ~250ms on a typical server core. Existing hashes
+# with a different cost are re-hashed on the user's next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 # Token expiration settings
 EMAIL_VERIFICATION_EXPIRE_HOURS = 24
 PASSWORD_RESET_EXPIRE_HOURS = 1
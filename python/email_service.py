@@ -4,6 +4,8 @@ Uses Resend API for email delivery.
 """
 
 import resend
+from resend.http_client import HTTPClient
+import httpx
 import logging
 from typing import Optional
 import kakuro.config as config
@@ -11,6 +13,43 @@ import kakuro.config as config
 logger = logging.getLogger(__name__)
 
 
+class _PooledResendClient(HTTPClient):
+    """
+    Resend's default client opens a fresh TLS connection for every email.
+    This one keeps a process-wide httpx.Client so sends reuse a warm keep-alive connection.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self._client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        )
+
+    def request(self, method, url, headers, json=None, files=None, data=None):
+        try:
+            resp = self._client.request(
+                method, url, headers=headers,
+                json=json if data is None and files is None else None,
+                files=files, data=data,
+            )
+            return resp.content, resp.status_code, resp.headers
+        except httpx.HTTPError as e:
+            # Resend turns RuntimeError into a ResendError, same as with its own client
+            raise RuntimeError(f"Request failed: {e}") from e
+
+    def close(self):
+        self._client.close()
+
+
+resend.default_http_client = _PooledResendClient()
+resend.api_key = config.RESEND_API_KEY
+
+
+def close_email_client():
+    """Closes the pooled Resend connection (called on app shutdown)."""
+    resend.default_http_client.close()
+
+
 def send_verification_email(email: str, code: str, user_name: Optional[str] = None) -> bool:
     """
     Send email verification link to user.
@@ -27,8 +66,6 @@ def send_verification_email(email: str, code: str, user_name: Optional[str] = No
         logger.error("Resend not configured, skipping email")
         return False
     
-    resend.api_key = config.RESEND_API_KEY
-    
     greeting = f"Hi {user_name}," if user_name else "Hi,"
     
     html_content = f"""
@@ -100,8 +137,6 @@ def send_password_reset_email(email: str, token: str, user_name: Optional[str] =
         logger.error("Resend not configured, skipping email")
         return False
     
-    resend.api_key = config.RESEND_API_KEY
-    
     reset_url = f"{config.APP_HOST}/reset-password?token={token}"
     
     greeting = f"Hi {user_name}," if user_name else "Hi,"
@@ -197,8 +232,6 @@ def send_welcome_email(email: str, user_name: Optional[str] = None) -> bool:
     if not config.is_resend_configured():
         return False
     
-    resend.api_key = config.RESEND_API_KEY
-    
     greeting = f"Hi {user_name}," if user_name else "Hi,"
     
     html_content = f"""
@@ -3,10 +3,13 @@ import time
 import logging
 import random
 import uuid
+from types import MappingProxyType
+from typing import Any, Mapping
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from .database import SessionLocal
 from .models import PuzzleTemplate, DifficultyStat
+from . import template_stats
 from .kakuro_wrapper import KakuroBoard, CSPSolver, KakuroDifficultyEstimator, generate_kakuro
 
 logger = logging.getLogger("kakuro_generator")
@@ -18,12 +21,20 @@ BATCH_SIZE = 5         # Generate 5 at a time to yield lock frequently
 CHECK_INTERVAL_SECONDS = 10
 FRESHNESS_BUFFER = 20  # Buffer above max user completions for freshness threshold
 
+# Static settings reported to the Admin Dashboard
+GENERATOR_SETTINGS = MappingProxyType({
+    "target_count": POOL_TARGET_SIZE,
+    "threshold": 10, # Fixed threshold for UI or calculate dynamically
+    "batch_size": BATCH_SIZE
+})
+
 class GeneratorService:
     def __init__(self):
         self._stop_event = threading.Event()
         self._thread = None
         self.running = False
         self._current_counts = {diff: 0 for diff in DIFFICULTY_LEVELS}
+        self._pool_report = MappingProxyType({diff: self._pool_entry(0) for diff in DIFFICULTY_LEVELS})
         self.difficulty_size_ranges = {}
 
     @property
@@ -31,15 +42,39 @@ class GeneratorService:
         """Returns current pool counts for the Admin Dashboard."""
         return self._current_counts
 
+    def status_snapshot(self) -> Mapping[str, int]:
+        """Read-only copy of the pool counts, taken in one step so readers see a consistent set."""
+        return MappingProxyType(dict(self._current_counts))
+
     @property
-    def settings(self) -> dict:
-        """Returns config for the Admin Dashboard."""
+    def pool_report(self) -> Mapping[str, dict]:
+        """Per-difficulty pool status for the Admin Dashboard, rebuilt whenever a count changes."""
+        return self._pool_report
+
+    @staticmethod
+    def _pool_entry(count: int) -> dict:
+        target = GENERATOR_SETTINGS["target_count"]
+        threshold = GENERATOR_SETTINGS["threshold"]
         return {
-            "target_count": POOL_TARGET_SIZE,
-            "threshold": 10, # Fixed threshold for UI or calculate dynamically
-            "batch_size": BATCH_SIZE
+            "count": count,
+            "target": target,
+            "threshold": threshold,
+            "fill_percent": (count / target) * 100 if target > 0 else 0,
+            "is_low": count <= threshold
         }
 
+    def _set_count(self, difficulty: str, count: int):
+        """Updates a pool count and swaps in a new report, so readers never see a half-updated one."""
+        self._current_counts[difficulty] = count
+        report = dict(self._pool_report)
+        report[difficulty] = self._pool_entry(count)
+        self._pool_report = MappingProxyType(report)
+
+    @property
+    def settings(self) -> Mapping[str, Any]:
+        """Returns config for the Admin Dashboard."""
+        return GENERATOR_SETTINGS
+
     def start(self, difficulty_size_ranges: dict[str, tuple[int, int]]):
         """Start the background generation thread."""
         self.difficulty_size_ranges = difficulty_size_ranges
@@ -119,6 +154,7 @@ class GeneratorService:
             grid=board.to_dict()
         )
         db.add(tmpl)
+        template_stats.bump(db, templates=1)
 
         # 5. Update Statistics for the FINAL difficulty
         stat = db.query(DifficultyStat).filter_by(difficulty=final_diff).first()
@@ -239,7 +275,7 @@ class GeneratorService:
                     PuzzleTemplate.times_used < threshold
                 ).count()
 
-                self._current_counts[difficulty] = fresh_count
+                self._set_count(difficulty, fresh_count)
                 if fresh_count < POOL_TARGET_SIZE:
                     logger.info(f"{difficulty} pool is low. Starting targeted generation batch...")
                     start_t = time.perf_counter()
@@ -314,6 +350,7 @@ class GeneratorService:
                 generated += 1
         
         if generated > 0:
+            template_stats.bump(db, templates=generated)
             db.commit()
             logger.info(f"Saved {generated} puzzles initially targeted as {target_diff}")
 
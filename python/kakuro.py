@@ -20,6 +20,7 @@ class Cell:
         self.clue_v: Optional[int] = None # Sum of the col below
         self.sector_h: Optional[List['Cell']] = None # Direct reference for speed
         self.sector_v: Optional[List['Cell']] = None # Direct reference for speed
+        self.idx: int = -1 # Slot in the solver's dense value list (assigned per solve)
 
     def to_dict(self):
         return {
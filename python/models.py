@@ -3,7 +3,7 @@ Database models for Kakuro Generator.
 Defines User and Puzzle models with SQLAlchemy.
 """
 
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, JSON, Text, Float
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, JSON, Text, Float, Index, LargeBinary, Computed, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .database import Base
@@ -74,6 +74,15 @@ class User(Base):
             "last_login": self.last_login.isoformat() if self.last_login else None,
         }
 
+# OAuth callback: look up the account linked to a provider identity
+Index("ix_users_oauth_provider_oauth_id", User.oauth_provider, User.oauth_id)
+# Verify/resend: only accounts still waiting for their code
+Index(
+    "ix_users_unverified", User.email,
+    sqlite_where=text("email_verified = 0"),
+    postgresql_where=text("email_verified = false")
+)
+
 class UserSession(Base):
     """Tracks user login sessions, device info, and duration."""
     __tablename__ = "user_sessions"
@@ -143,9 +152,35 @@ class DifficultyStat(Base):
     def mean(self) -> float:
         return self.sum_scores / self.count if self.count > 0 else 0.0
 
+class TemplateStat(Base):
+    """
+    Single-row running totals over puzzle_templates for the admin overview.
+    Use/skip counters are bumped on write; the row is fully recomputed periodically.
+    """
+    __tablename__ = "template_stats"
+
+    id = Column(Integer, primary_key=True)
+    templates = Column(Integer, default=0, nullable=False)
+    total_uses = Column(Integer, default=0, nullable=False)
+    total_skips = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    @property
+    def avg_uses(self) -> float:
+        return self.total_uses / self.templates if self.templates > 0 else 0.0
+
 class Puzzle(Base):
     """Puzzle model for storing user's saved puzzles."""
     __tablename__ = "puzzles"
+    __table_args__ = (
+        # Solve-time stats only look at solved puzzles, grouped by difficulty
+        Index(
+            "ix_puzzles_solved_difficulty", "difficulty",
+            sqlite_where=text("status = 'solved'"),
+            postgresql_where=text("status = 'solved'")
+        ),
+        Index("ix_puzzles_status_difficulty", "status", "difficulty"),
+    )
     
     id = Column(String, primary_key=True)
     short_id = Column(String, unique=True, nullable=True, index=True)
@@ -175,6 +210,10 @@ class Puzzle(Base):
     # Status
     status = Column(String, default="started")  # 'started', 'solved', 'given_up'
     
+    # Solve stats, filled in once when the puzzle transitions to 'solved'
+    solve_seconds = Column(Float, nullable=True)  # first to last solving interaction
+    solve_moves = Column(Integer, nullable=True)
+    
     # Timestamps
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -182,7 +221,7 @@ class Puzzle(Base):
     # Relationships
     user = relationship("User", back_populates="puzzles")
     template = relationship("PuzzleTemplate", back_populates="puzzles")
-    interactions = relationship("PuzzleInteraction", back_populates="puzzle", cascade="all, delete-orphan")
+    interactions = relationship("PuzzleInteraction", back_populates="puzzle", cascade="all, delete-orphan", order_by="PuzzleInteraction.timestamp")
     
     def to_dict(self):
         """Convert puzzle to dictionary for API responses."""
@@ -206,6 +245,9 @@ class Puzzle(Base):
             "short_id": self.short_id
         }
 
+# Admin ratings list: ORDER BY rating DESC, created_at DESC LIMIT 100
+Index("ix_puzzles_rating_created", Puzzle.rating.desc(), Puzzle.created_at.desc())
+
 class PuzzleInteraction(Base):
     """
     Granular log of every action taken on a puzzle.
@@ -240,6 +282,7 @@ class PuzzleInteraction(Base):
     
     # Progress
     fill_count = Column(Integer, nullable=True) # How many white cells are filled at this moment
+    fill_bucket = Column(Integer, Computed("fill_count / 2", persisted=True)) # Progress bucket for the solving stats
     
     # Device context (in case they switch devices mid-puzzle)
     device_type = Column(String, nullable=True) # 'mobile', 'desktop'
@@ -249,11 +292,36 @@ class PuzzleInteraction(Base):
     user = relationship("User", back_populates="interactions")
     session = relationship("UserSession", back_populates="interactions")
 
+# User journey: newest interactions of one user, paged by timestamp
+Index("ix_puzzle_interactions_user_timestamp", PuzzleInteraction.user_id, PuzzleInteraction.timestamp.desc())
+# Puzzle detail: one puzzle's interactions in order
+Index("ix_puzzle_interactions_puzzle_timestamp", PuzzleInteraction.puzzle_id, PuzzleInteraction.timestamp)
+# Solving stats: move speeds only look at timed INPUT actions
+Index(
+    "ix_puzzle_interactions_action_duration", PuzzleInteraction.action_type, PuzzleInteraction.duration_ms,
+    sqlite_where=text("duration_ms > 0"),
+    postgresql_where=text("duration_ms > 0")
+)
+# Solving stats: move speed per progress bucket, grouped in index order
+Index(
+    "ix_puzzle_interactions_action_bucket",
+    PuzzleInteraction.action_type, PuzzleInteraction.fill_bucket, PuzzleInteraction.duration_ms,
+    sqlite_where=text("duration_ms > 0"),
+    postgresql_where=text("duration_ms > 0")
+)
+
 class PerformanceMetric(Base):
     """
     Stores various performance metrics for the system and application.
     """
     __tablename__ = "performance_metrics"
+    __table_args__ = (
+        # Trend queries filter by metric_name and a time range
+        Index("ix_performance_metrics_name_timestamp", "metric_name", "timestamp"),
+        # Request stats group by path and auth status; covers the time filter and
+        # the averaged value so the grouped scan never touches the table
+        Index("ix_performance_metrics_name_path_ts", "metric_name", "path", "auth_status", "timestamp", "value"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     metric_name = Column(String, nullable=False, index=True) # e.g., 'queue_fill_time', 'request_duration'
@@ -262,6 +330,10 @@ class PerformanceMetric(Base):
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     metadata_json = Column(JSON, nullable=True) # Extra context (route, difficulty, etc.)
 
+    # Copied out of metadata_json so request stats can group on plain indexed columns
+    path = Column(String, nullable=True)
+    auth_status = Column(String, nullable=True) # 'authenticated' / 'anonymous'
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -272,6 +344,18 @@ class PerformanceMetric(Base):
             "metadata": self.metadata_json
         }
 
+class PerformanceMetricRollup(Base):
+    """
+    Per-minute aggregates of selected performance metrics.
+    Maintained by the metric flusher so trend charts don't scan raw samples.
+    """
+    __tablename__ = "performance_metric_rollups"
+
+    metric_name = Column(String, primary_key=True)
+    bucket_ts = Column(DateTime, primary_key=True) # Start of the minute
+    sum = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
 class AuthLog(Base):
     """
     Logs login and registration attempts, including IP addresses and success status.
@@ -315,4 +399,15 @@ class ScoreRecord(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
     # Relationships
-    user = relationship("User", back_populates="scores")
\ No newline at end of file
+    user = relationship("User", back_populates="scores")
+
+class ApiCache(Base):
+    """
+    Cache-aside store for expensive admin responses.
+    Values are serialized JSON; expires_at is a unix timestamp.
+    """
+    __tablename__ = "api_cache"
+
+    key = Column(String, primary_key=True)
+    value = Column(LargeBinary, nullable=False)
+    expires_at = Column(Integer, nullable=False, index=True)
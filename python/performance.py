@@ -5,18 +5,113 @@ except ImportError:
     PSUTIL_AVAILABLE = False
     
 import logging
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Float
-from .models import PerformanceMetric, AuthLog, PuzzleTemplate
+from sqlalchemy import func, cast, Float, insert
+from .models import PerformanceMetric, PerformanceMetricRollup, AuthLog, PuzzleTemplate
+from . import config
 from datetime import datetime, timezone
+from collections import deque
+import threading
+import io
+import csv
+import json
+import atexit
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 import time
 import os
 
 logger = logging.getLogger("performance")
 
-# Concurrent request tracker
-ACTIVE_REQUESTS = 0
+# Concurrent request tracker. A plain int under its own lock: the critical
+# sections are a single add, so contention stays negligible.
+_active_requests = 0
+_active_requests_lock = threading.Lock()
+
+def request_started():
+    global _active_requests
+    with _active_requests_lock:
+        _active_requests += 1
+
+def request_finished():
+    global _active_requests
+    with _active_requests_lock:
+        _active_requests -= 1
+
+def active_requests() -> int:
+    """Number of requests currently in flight."""
+    with _active_requests_lock:
+        return _active_requests
+
+# Write-behind buffers. record_metric/log_auth_attempt only append here;
+# the background flusher (start_metric_flusher) drains them in bulk.
+FLUSH_INTERVAL_SECONDS = 2.0
+FLUSH_THRESHOLD_ROWS = 500
+AUTH_FLUSH_THRESHOLD_ROWS = 100  # Audit rows are rarer and worth persisting sooner
+FLUSH_BATCH_SIZE = 2000
+ROLLUP_METRICS = ("system_cpu_percent", "system_memory_percent")  # Also aggregated per minute
+COPY_THRESHOLD_ROWS = 1000  # PostgreSQL only: switch from INSERT to COPY above this
+BUFFER_MAX_ROWS = 50000  # Caps memory if the database stays unreachable; excess rows are dropped
+
+_METRIC_BUFFER: deque = deque(maxlen=BUFFER_MAX_ROWS)
+_AUTH_BUFFER: deque = deque(maxlen=BUFFER_MAX_ROWS)
+_BUFFER_LOCK = threading.Lock()
+_FLUSH_EVENT = threading.Event()
+_flusher_thread: Optional[threading.Thread] = None
+
+# log_system_performance runs every monitor tick; the template aggregates are
+# full scans of puzzle_templates, so only run them on every Nth tick.
+QUALITY_SAMPLE_EVERY = 10
+GENERATOR_SAMPLE_EVERY = 5
+_monitor_ticks = itertools.count()
+# Runs log_system_performance's two halves side by side
+_perf_log_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="perf-log")
+
+# get_system_metrics() is polled by the dashboard; reuse a reading for a short while
+SYSTEM_METRICS_TTL_SECONDS = 1.5
+_sys_cache: Dict[str, Any] = {"t": 0.0, "v": None}
+_PROC = psutil.Process() if PSUTIL_AVAILABLE else None
+
+def _enqueue(buffer: deque, row: Dict[str, Any], threshold: int = FLUSH_THRESHOLD_ROWS):
+    """Appends a row for the flusher and wakes it early once enough rows are pending."""
+    with _BUFFER_LOCK:
+        buffer.append(row)
+        pending = len(buffer)
+    if pending >= threshold:
+        _FLUSH_EVENT.set()
+
+_ANONYMOUS_META: Dict[str, Any] = {"user_type": "anonymous"}
+
+def user_meta(user: Optional[Any]) -> Dict[str, Any]:
+    """The user stamp merged into metric metadata; compute once and reuse for repeated metrics."""
+    if user:
+        # Check if user is authenticated (assuming user object from models.py)
+        return {"user_type": "authenticated", "user_id": getattr(user, "id", None)}
+    return _ANONYMOUS_META
+
+def metric_row(
+    name: str,
+    value: float,
+    unit: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    user: Optional[Any] = None,
+    stamp: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Builds a PerformanceMetric insert mapping. Pass a precomputed user_meta() as `stamp` to skip the user lookup."""
+    if stamp is None:
+        stamp = user_meta(user)
+    final_metadata = {**metadata, **stamp} if metadata else dict(stamp)
+
+    return {
+        "metric_name": name,
+        "value": value,
+        "unit": unit,
+        "metadata_json": final_metadata,
+        "path": final_metadata.get("path"),
+        "auth_status": final_metadata["user_type"],
+        "timestamp": datetime.now(timezone.utc)
+    }
 
 def record_metric(
     db: Session, 
@@ -24,30 +119,176 @@ def record_metric(
     value: float, 
     unit: Optional[str] = None, 
     metadata: Optional[Dict[str, Any]] = None,
-    user: Optional[Any] = None
+    user: Optional[Any] = None,
+    stamp: Optional[Dict[str, Any]] = None
 ):
-    """Saves a performance metric to the database."""
+    """
+    Queues a performance metric for the background flusher.
+    The session is not touched; rows are written by flush_metrics().
+    """
+    _enqueue(_METRIC_BUFFER, metric_row(name, value, unit, metadata, user, stamp))
+
+def record_metrics_bulk(db: Session, rows: List[Dict[str, Any]]):
+    """Writes a list of metric_row() mappings in a single insert and commit."""
+    if not rows:
+        return
     try:
-        final_metadata = metadata or {}
+        db.bulk_insert_mappings(PerformanceMetric, rows)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to record {len(rows)} metrics: {e}")
+        db.rollback()
 
-        if user:
-            # Check if user is authenticated (assuming user object from models.py)
-            final_metadata["user_type"] = "authenticated"
-            final_metadata["user_id"] = getattr(user, "id", None)
-        else:
-            final_metadata["user_type"] = "anonymous"
+def _drain(buffer: deque) -> list:
+    """Pops up to FLUSH_BATCH_SIZE rows from a buffer."""
+    with _BUFFER_LOCK:
+        count = min(len(buffer), FLUSH_BATCH_SIZE)
+        return [buffer.popleft() for _ in range(count)]
+
+def _requeue(buffer: deque, rows: list):
+    """Puts a batch that failed to write back at the front of its buffer, in order."""
+    with _BUFFER_LOCK:
+        # On a full buffer extendleft drops from the right, i.e. the newest rows
+        buffer.extendleft(reversed(rows))
 
-        metric = PerformanceMetric(
-            metric_name=name,
-            value=value,
-            unit=unit,
-            metadata_json=final_metadata
+_COPY_COLUMNS = ("metric_name", "value", "unit", "metadata_json", "path", "auth_status", "timestamp")
+
+def _copy_metrics(db: Session, rows: List[Dict[str, Any]]) -> bool:
+    """
+    Streams metric rows into PostgreSQL with COPY FROM STDIN.
+    Returns False if the driver has no COPY support (caller falls back to INSERT).
+    """
+    cursor = db.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):  # psycopg2 only
+        cursor.close()
+        return False
+
+    buf = io.StringIO()
+    # QUOTE_STRINGS leaves None unquoted and empty, which COPY ... CSV reads as NULL
+    writer = csv.writer(buf, quoting=csv.QUOTE_STRINGS)
+    for row in rows:
+        writer.writerow((
+            row["metric_name"],
+            row["value"],
+            row["unit"],
+            json.dumps(row["metadata_json"]) if row["metadata_json"] is not None else None,
+            row["path"],
+            row["auth_status"],
+            row["timestamp"].isoformat()
+        ))
+    buf.seek(0)
+    try:
+        cursor.copy_expert(
+            f"COPY {PerformanceMetric.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH CSV",
+            buf
         )
-        db.add(metric)
-        db.commit()
+    finally:
+        cursor.close()
+    return True
+
+def _insert_metrics(db: Session, rows: List[Dict[str, Any]]):
+    """Bulk-inserts metric rows, using COPY on PostgreSQL for large batches."""
+    if len(rows) >= COPY_THRESHOLD_ROWS and db.get_bind().dialect.name == "postgresql":
+        if _copy_metrics(db, rows):
+            return
+    db.bulk_insert_mappings(PerformanceMetric, rows)
+
+def _update_rollups(db: Session, rows: List[Dict[str, Any]]):
+    """Adds the batch's ROLLUP_METRICS samples into their per-minute rollup buckets."""
+    buckets: Dict[tuple, List[float]] = {}
+    for row in rows:
+        if row["metric_name"] in ROLLUP_METRICS:
+            key = (row["metric_name"], row["timestamp"].replace(second=0, microsecond=0))
+            acc = buckets.setdefault(key, [0.0, 0])
+            acc[0] += row["value"]
+            acc[1] += 1
+    if not buckets:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    stmt = upsert(PerformanceMetricRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PerformanceMetricRollup.metric_name, PerformanceMetricRollup.bucket_ts],
+        set_={
+            "sum": PerformanceMetricRollup.sum + stmt.excluded.sum,
+            "count": PerformanceMetricRollup.count + stmt.excluded.count
+        }
+    )
+    db.execute(stmt, [
+        {"metric_name": name, "bucket_ts": bucket_ts, "sum": total, "count": count}
+        for (name, bucket_ts), (total, count) in buckets.items()
+    ])
+
+def flush_metrics(db: Session) -> int:
+    """
+    Writes all buffered metrics and auth logs to the database.
+    Returns the number of rows written. Call on shutdown to avoid losing the tail.
+    A batch that fails to write is put back and retried on the next pass.
+    """
+    written = 0
+    while True:
+        metrics = _drain(_METRIC_BUFFER)
+        auth_logs = _drain(_AUTH_BUFFER)
+        if not metrics and not auth_logs:
+            break
+        failed = False
+        # Separate transactions, so a failing metric batch can't take the audit rows with it
+        if auth_logs:
+            try:
+                # Core executemany; skips the ORM unit of work entirely
+                db.execute(insert(AuthLog), auth_logs)
+                db.commit()
+                written += len(auth_logs)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(auth_logs)} auth logs: {e}")
+                db.rollback()
+                _requeue(_AUTH_BUFFER, auth_logs)
+                failed = True
+        if metrics:
+            try:
+                _insert_metrics(db, metrics)
+                _update_rollups(db, metrics)
+                db.commit()
+                written += len(metrics)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(metrics)} metrics: {e}")
+                db.rollback()
+                _requeue(_METRIC_BUFFER, metrics)
+                failed = True
+        if failed:
+            break
+    return written
+
+def _flush_loop(db_session_factory):
+    while True:
+        _FLUSH_EVENT.wait(FLUSH_INTERVAL_SECONDS)
+        _FLUSH_EVENT.clear()
+        try:
+            with db_session_factory() as db:
+                flush_metrics(db)
+        except Exception as e:
+            logger.error(f"Error in metric flusher: {e}")
+
+def start_metric_flusher(db_session_factory):
+    """Starts the daemon thread that periodically drains the metric buffers."""
+    global _flusher_thread
+    if _flusher_thread and _flusher_thread.is_alive():
+        return
+    _flusher_thread = threading.Thread(target=_flush_loop, args=(db_session_factory,), daemon=True)
+    _flusher_thread.start()
+    # Daemon threads die with the interpreter; write out whatever is still buffered
+    atexit.register(_flush_at_exit, db_session_factory)
+
+def _flush_at_exit(db_session_factory):
+    try:
+        with db_session_factory() as db:
+            flush_metrics(db)
     except Exception as e:
-        logger.error(f"Failed to record metric {name}: {e}")
-        db.rollback()
+        logger.error(f"Failed to flush metrics at exit: {e}")
 
 def log_auth_attempt(
     db: Session,
@@ -58,25 +299,25 @@ def log_auth_attempt(
     user_id: Optional[str] = None,
     reason: Optional[str] = None
 ):
-    """Logs an authentication attempt (login, register, etc.)."""
+    """Queues an authentication attempt (login, register, etc.) for the background flusher."""
     try:
         ip_address = request.client.host if request.client else "Unknown"
         user_agent = request.headers.get("user-agent", "Unknown")
-        
-        log = AuthLog(
-            user_id=user_id,
-            email=email,
-            action=action,
-            status=status,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            reason=reason
-        )
-        db.add(log)
-        db.commit()
     except Exception as e:
         logger.error(f"Failed to log auth attempt for {email}: {e}")
-        db.rollback()
+        return
+
+    row = {
+        "user_id": user_id,
+        "email": email,
+        "action": action,
+        "status": status,
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "reason": reason,
+        "timestamp": datetime.now(timezone.utc)
+    }
+    _enqueue(_AUTH_BUFFER, row, AUTH_FLUSH_THRESHOLD_ROWS)
 
 class Timer:
     """Context manager for timing code blocks."""
@@ -93,6 +334,7 @@ class Timer:
         self.unit = unit
         self.metadata = metadata or {}
         self.user = user
+        self._user_meta = user_meta(user)
         self.start_time = None
 
     def __enter__(self):
@@ -108,10 +350,15 @@ class Timer:
         else:
             val = duration
             
-        record_metric(self.db, self.name, val, self.unit, self.metadata, user=self.user)
+        # Only a deque append on the request path; the flusher does the DB write
+        _enqueue(_METRIC_BUFFER, metric_row(self.name, val, self.unit, self.metadata, stamp=self._user_meta))
 
 def get_system_metrics() -> Dict[str, Any]:
-    """Collects current CPU and Memory usage."""
+    """Collects current CPU and Memory usage (cached for SYSTEM_METRICS_TTL_SECONDS)."""
+    now = time.monotonic()
+    if _sys_cache["v"] and now - _sys_cache["t"] < SYSTEM_METRICS_TTL_SECONDS:
+        return dict(_sys_cache["v"])
+
     if not PSUTIL_AVAILABLE:
         # Fallback or empty metrics if psutil is missing
         import multiprocessing
@@ -125,10 +372,9 @@ def get_system_metrics() -> Dict[str, Any]:
     try:
         cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
-        process = psutil.Process(os.getpid())
-        process_memory = process.memory_info().rss
+        process_memory = _PROC.memory_info().rss
         
-        return {
+        metrics = {
             "cpu_percent": cpu_percent,
             "memory_percent": memory.percent,
             "memory_used_bytes": memory.used,
@@ -136,87 +382,128 @@ def get_system_metrics() -> Dict[str, Any]:
             "cpu_count": psutil.cpu_count(logical=True),
             "physical_cpu_count": psutil.cpu_count(logical=False)
         }
+        _sys_cache["t"] = now
+        _sys_cache["v"] = metrics
+        return dict(metrics)
     except Exception as e:
         logger.error(f"Failed to collect system metrics: {e}")
         return {}
 
-def log_puzzle_quality_metrics(db: Session):
-    """Calculates and logs aggregate skip rates and puzzle quality."""
+def log_puzzle_quality_metrics(db: Session) -> Optional[float]:
+    """
+    Calculates and logs aggregate skip rates and puzzle quality.
+    Returns the average template usage (pool freshness) so callers can reuse it.
+    """
+    rows = []
+    avg_uses = None
     try:
-        # Calculate overall skip rate across all templates
-        stats = db.query(
-            func.sum(PuzzleTemplate.times_used).label("total_uses"),
-            func.sum(PuzzleTemplate.times_skipped).label("total_skips")
-        ).first()
-
-        if stats and stats.total_uses and stats.total_uses > 0:
-            skip_rate = (stats.total_skips / stats.total_uses) * 100
-            record_metric(db, "aggregate_skip_rate", skip_rate, "%")
-            record_metric(db, "total_puzzle_uses", float(stats.total_uses), "count")
-
-        # Log skip rate per difficulty
+        # Per-difficulty sums in one pass; the overall totals are summed from these rows
         diff_stats = db.query(
             PuzzleTemplate.difficulty,
             func.sum(PuzzleTemplate.times_used),
-            func.sum(PuzzleTemplate.times_skipped)
+            func.sum(PuzzleTemplate.times_skipped),
+            func.count(PuzzleTemplate.times_used)
         ).group_by(PuzzleTemplate.difficulty).all()
 
-        for diff, uses, skips in diff_stats:
+        total_uses = sum(uses or 0 for _, uses, _, _ in diff_stats)
+        total_skips = sum(skips or 0 for _, _, skips, _ in diff_stats)
+        total_templates = sum(n for _, _, _, n in diff_stats)
+        avg_uses = total_uses / total_templates if total_templates else 0.0
+
+        if total_uses > 0:
+            skip_rate = (total_skips / total_uses) * 100
+            rows.append(metric_row("aggregate_skip_rate", skip_rate, "%"))
+            rows.append(metric_row("total_puzzle_uses", float(total_uses), "count"))
+
+        # Log skip rate per difficulty
+        for diff, uses, skips, _ in diff_stats:
             if uses > 0:
                 rate = (skips / uses) * 100
-                record_metric(db, f"skip_rate_{diff}", rate, "%", {"difficulty": diff})
+                rows.append(metric_row(f"skip_rate_{diff}", rate, "%", {"difficulty": diff}))
 
     except Exception as e:
         logger.error(f"Error logging quality metrics: {e}")
 
-def log_generator_status(db: Session):
-    """Logs the state of the background generator service."""
+    record_metrics_bulk(db, rows)
+    return avg_uses
+
+def log_generator_status(db: Session, avg_uses: Optional[float] = None):
+    """
+    Logs the state of the background generator service.
+    `avg_uses` can be passed in from log_puzzle_quality_metrics to skip re-aggregating the templates.
+    """
+    rows = []
     try:
         from .generator_service import generator_service
         # 1. Fill Level & Thresholds (from generator_service)
-        # Using the .status property which returns {difficulty: count}
-        current_counts = generator_service.status 
-        target = generator_service.settings.get("target_count", 50)
-        threshold = generator_service.settings.get("threshold", 10)
+        # Consistent {difficulty: count} snapshot; settings are static
+        current_counts = generator_service.status_snapshot()
+        settings = generator_service.settings
+        target = settings.get("target_count", 50)
+        threshold = settings.get("threshold", 10)
 
         
         for difficulty, count in current_counts.items():
             fill_percentage = (count / target) * 100 if target > 0 else 0
-            record_metric(db, f"gen_fill_{difficulty}", fill_percentage, "%", {
+            rows.append(metric_row(f"gen_fill_{difficulty}", fill_percentage, "%", {
                 "count": count,
                 "target": target,
                 "threshold": threshold,
                 "is_low": count <= threshold
-            })
+            }))
 
         # 2. Pool Freshness (Average usage of templates in DB)
         # Low average = Fresh pool; High average = Stale pool (users seeing repeats)
-        avg_uses = db.query(func.avg(PuzzleTemplate.times_used)).scalar() or 0
-        record_metric(db, "pool_freshness_index", float(avg_uses), "avg_uses")
+        if avg_uses is None:
+            avg_uses = db.query(func.avg(PuzzleTemplate.times_used)).scalar() or 0
+        rows.append(metric_row("pool_freshness_index", float(avg_uses), "avg_uses"))
 
     except Exception as e:
         logger.warning(f"Could not log generator status: {e}")
 
-def log_system_performance(db_session_factory):
-    """Utility to be run in a background task to log system performance periodically."""
+    record_metrics_bulk(db, rows)
+
+def _log_host_metrics():
+    """Buffers CPU/memory/load readings (psutil only, no DB access)."""
     metrics = get_system_metrics()
     if not metrics:
         return
 
+    if "cpu_percent" in metrics:
+        record_metric(None, "system_cpu_percent", metrics["cpu_percent"], "%")
+    if "memory_percent" in metrics:
+        record_metric(None, "system_memory_percent", metrics["memory_percent"], "%")
+    if "process_memory_bytes" in metrics:
+        record_metric(None, "process_memory_bytes", metrics["process_memory_bytes"], "bytes")
+    
+    # Log active requests as a proxy for load
+    record_metric(None, "active_requests_count", float(active_requests()), "count")
+
+def _log_pool_metrics(db_session_factory, tick: int):
+    """
+    Quality/skip and generator metrics, sampled every Nth tick.
+    Both quality samples land on generator ticks, so the template aggregate is shared then.
+    """
+    run_quality = tick % QUALITY_SAMPLE_EVERY == 0
+    run_generator = tick % GENERATOR_SAMPLE_EVERY == 0
+    if not (run_quality or run_generator):
+        return
+
     with db_session_factory() as db:
-        if "cpu_percent" in metrics:
-            record_metric(db, "system_cpu_percent", metrics["cpu_percent"], "%")
-        if "memory_percent" in metrics:
-            record_metric(db, "system_memory_percent", metrics["memory_percent"], "%")
-        if "process_memory_bytes" in metrics:
-            record_metric(db, "process_memory_bytes", metrics["process_memory_bytes"], "bytes")
-        
-        # Log active requests as a proxy for load
-        global ACTIVE_REQUESTS
-        record_metric(db, "active_requests_count", float(ACTIVE_REQUESTS), "count")
+        avg_uses = log_puzzle_quality_metrics(db) if run_quality else None
+        if run_generator:
+            log_generator_status(db, avg_uses)
 
-        # 3. New: Quality & Skip Metrics
-        log_puzzle_quality_metrics(db)
+def log_system_performance(db_session_factory):
+    """Utility to be run in a background task to log system performance periodically."""
+    if not config.SYSTEM_METRICS_ENABLED:
+        return
 
-        # 4. New: Generator State Metrics
-        log_generator_status(db)
\ No newline at end of file
+    tick = next(_monitor_ticks)
+    # The psutil reads and the DB aggregates are independent; overlap them
+    futures = [
+        _perf_log_pool.submit(_log_host_metrics),
+        _perf_log_pool.submit(_log_pool_metrics, db_session_factory, tick)
+    ]
+    for future in futures:
+        future.result()
@@ -1,250 +1,329 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, cast, Float, Integer, distinct
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import func, desc, cast, Float, Integer, distinct, select, literal, tuple_
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, date, timedelta, timezone
 
 from kakuro.database import get_db
-from kakuro.models import User, Puzzle, PuzzleTemplate, PuzzleInteraction, PerformanceMetric, AuthLog
+from kakuro.models import User, Puzzle, PuzzleTemplate, PuzzleInteraction, PerformanceMetric, PerformanceMetricRollup, AuthLog
 from kakuro.auth import get_admin_user
 import kakuro.performance as performance
+import kakuro.template_stats as template_stats
 from kakuro.generator_service import generator_service
+from kakuro.api_cache import cached_sqlite
 import os
 import re
+import json
+import time
+import hashlib
+import functools
+import glob
+import gzip
+import threading
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+# orjson serializes the large metric/log listings (and datetimes) much faster than json
+router = APIRouter(prefix="/admin", tags=["admin"], default_response_class=ORJSONResponse)
+
+# Response Models
+class AuthLogOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: Optional[str] = None
+    email: str
+    action: str
+    status: str
+    ip_address: Optional[str] = None
+    reason: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+# Endpoints here are plain `def`: they run blocking SQLAlchemy/file I/O, so FastAPI
+# dispatches them to its threadpool instead of running them on the event loop.
+
+# Runs independent dashboard queries side by side on separate pooled connections
+_stats_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="admin-stats")
+
+# The overview is polled by the dashboard; its numbers only move on a seconds scale
+OVERVIEW_CACHE_TTL = 3.0
+_overview_cache: Dict[str, Any] = {"t": 0.0, "v": None, "etag": None}
+_overview_lock = threading.Lock()
 
 @router.get("/stats/overview")
-async def get_overview_stats(
+def get_overview_stats(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     admin: User = Depends(get_admin_user)
 ):
-    """General overview statistics for the admin dashboard."""
-    user_count = db.query(User).count()
-    puzzle_count = db.query(Puzzle).count()
-    template_count = db.query(PuzzleTemplate).count()
-    
+    """General overview statistics for the admin dashboard (cached for OVERVIEW_CACHE_TTL seconds)."""
+    with _overview_lock:
+        now = time.monotonic()
+        if _overview_cache["v"] is None or now - _overview_cache["t"] >= OVERVIEW_CACHE_TTL:
+            stats = _compute_overview_stats(db)
+            _overview_cache["v"] = stats
+            _overview_cache["etag"] = '"' + hashlib.sha1(json.dumps(stats, sort_keys=True, default=str).encode()).hexdigest()[:16] + '"'
+            _overview_cache["t"] = now
+        stats, etag = _overview_cache["v"], _overview_cache["etag"]
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return stats
+
+def _compute_overview_stats(db: Session) -> Dict[str, Any]:
     # Active sessions (last 15 minutes)
     fifteen_mins_ago = datetime.now(timezone.utc) - timedelta(minutes=15)
-    active_sessions = db.query(func.count(User.id)).filter(User.last_login >= fifteen_mins_ago).scalar()
+
+    # Template count and quality totals come from the running totals row
+    pool = template_stats.get(db)
+
+    # All counts in one round-trip
+    stats = db.execute(select(
+        select(func.count()).select_from(User).scalar_subquery().label("users"),
+        select(func.count()).select_from(Puzzle).scalar_subquery().label("puzzles"),
+        select(func.count(User.id)).where(User.last_login >= fifteen_mins_ago).scalar_subquery().label("active")
+    )).one()
     
     # System info
     sys_metrics = performance.get_system_metrics()
 
-    quality_stats = db.query(
-        func.sum(PuzzleTemplate.times_used).label("total_uses"),
-        func.sum(PuzzleTemplate.times_skipped).label("total_skips"),
-        func.avg(PuzzleTemplate.times_used).label("avg_uses")
-    ).first()
-
     global_skip_rate = 0
-    if quality_stats and quality_stats.total_uses:
-        global_skip_rate = (quality_stats.total_skips / quality_stats.total_uses) * 100
+    if pool.total_uses:
+        global_skip_rate = (pool.total_skips / pool.total_uses) * 100
     
     return {
         "counts": {
-            "users": user_count,
-            "puzzles_played": puzzle_count,
-            "puzzle_templates": template_count,
-            "active_users_15m": active_sessions
+            "users": stats.users,
+            "puzzles_played": stats.puzzles,
+            "puzzle_templates": pool.templates,
+            "active_users_15m": stats.active
         },
         "quality": {
             "global_skip_rate": global_skip_rate,
-            "pool_freshness": float(quality_stats.avg_uses or 0)
+            "pool_freshness": pool.avg_uses
         },
         "system": sys_metrics,
-        "active_requests": performance.ACTIVE_REQUESTS
+        "active_requests": performance.active_requests()
     }
 
+def _load_trend_rows(bind, since: datetime):
+    """CPU/memory trends from the per-minute rollups (see performance.flush_metrics)."""
+    with Session(bind=bind) as db:
+        return db.query(
+            PerformanceMetricRollup.metric_name,
+            PerformanceMetricRollup.bucket_ts,
+            (PerformanceMetricRollup.sum / PerformanceMetricRollup.count).label("value")
+        ).filter(
+            PerformanceMetricRollup.metric_name.in_(["system_cpu_percent", "system_memory_percent"]),
+            PerformanceMetricRollup.bucket_ts >= since
+        ).order_by(PerformanceMetricRollup.bucket_ts).all()
+
 @router.get("/stats/performance")
-async def get_performance_stats(
+@cached_sqlite(ttl=300)
+def get_performance_stats(
     db: Session = Depends(get_db),
     admin: User = Depends(get_admin_user),
     hours: int = 24
 ):
     """Detailed performance metrics for the last X hours."""
     since = datetime.now(timezone.utc) - timedelta(hours=hours)
+
+    # The trend query is independent: run it on its own connection while the
+    # request stats aggregate runs on this one
+    trends_future = _stats_pool.submit(_load_trend_rows, db.get_bind(), since)
     
     # Average request duration per path
     req_stats = db.query(
-        PerformanceMetric.metadata_json["path"].label("path"),
-        PerformanceMetric.metadata_json["user_type"].label("auth_status"),
+        PerformanceMetric.path,
+        PerformanceMetric.auth_status,
         func.avg(PerformanceMetric.value).label("avg_ms"),
         func.count(PerformanceMetric.id).label("count")
     ).filter(
         PerformanceMetric.metric_name == "api_request_duration_ms",
         PerformanceMetric.timestamp >= since
-    ).group_by("path", "auth_status").all()
+    ).group_by(PerformanceMetric.path, PerformanceMetric.auth_status).all()
     
-    # System load trends (simplified)
-    cpu_load = db.query(
-        PerformanceMetric.timestamp,
-        PerformanceMetric.value
-    ).filter(
-        PerformanceMetric.metric_name == "system_cpu_percent",
-        PerformanceMetric.timestamp >= since
-    ).order_by(PerformanceMetric.timestamp).all()
-
-    mem_load = db.query(
-        PerformanceMetric.timestamp,
-        PerformanceMetric.value
-    ).filter(
-        PerformanceMetric.metric_name == "system_memory_percent",
-        PerformanceMetric.timestamp >= since
-    ).order_by(PerformanceMetric.timestamp).all()
+    trends = {"system_cpu_percent": [], "system_memory_percent": []}
+    for name, ts, value in trends_future.result():
+        trends[name].append({"time": ts, "value": value})
     
     return {
         "requests": [{"path": r.path, "auth_status": r.auth_status, "avg_ms": r.avg_ms, "count": r.count} for r in req_stats],
-        "cpu_trend": [{"time": c.timestamp.isoformat(), "value": c.value} for c in cpu_load],
-        "memory_trend": [{"time": m.timestamp.isoformat(), "value": m.value} for m in mem_load]
+        "cpu_trend": trends["system_cpu_percent"],
+        "memory_trend": trends["system_memory_percent"]
     }
 
+# Generator settings are static for the lifetime of the process
 @router.get("/stats/generator")
-async def get_generator_stats(
+def get_generator_stats(
+    response: Response,
     admin: User = Depends(get_admin_user)
 ):
     """Real-time status of the background puzzle generator."""
-    current_counts = generator_service.status
-    settings = generator_service.settings
-    target = settings.get("target_count", 50)
-    threshold = settings.get("threshold", 10)
-
-    res = {}
-    for diff, count in current_counts.items():
-        res[diff] = {
-            "count": count,
-            "target": target,
-            "threshold": threshold,
-            "fill_percent": (count / target) * 100 if target > 0 else 0,
-            "is_low": count <= threshold
-        }
-    return {"difficulties": res}
+    # Pool counts only change once per generator check, let the poller reuse them briefly
+    response.headers["Cache-Control"] = "max-age=5, private"
+    return {"difficulties": generator_service.pool_report}
+
+# Bound once; used for every row of the journey listing
+_format_cell_detail = "Cell [{},{}] -> {}".format
 
 @router.get("/user/{identifier}/journey")
-async def get_user_journey(
+def get_user_journey(
     identifier: str,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_admin_user)
+    admin: User = Depends(get_admin_user),
+    before: Optional[datetime] = None
 ):
-    """Follow a specific user's behavior timeline."""
-    user = db.query(User).filter(
-        (User.id == identifier) | (User.username == identifier)
-    ).first()
+    """
+    Follow a specific user's behavior timeline.
+    Returns the newest 100 interactions; pass `before` (the returned `next_before`) to page further back.
+    """
+    # Two separate lookups: an OR across id/username can't use either index
+    user = db.get(User, identifier) or db.query(User).filter(User.username == identifier).first()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    interactions = db.query(PuzzleInteraction).filter(
-        PuzzleInteraction.user_id == user.id
-    ).order_by(PuzzleInteraction.timestamp.desc()).limit(100).all()
+    # Only the columns the timeline shows, no full ORM objects
+    query = db.query(
+        PuzzleInteraction.timestamp,
+        PuzzleInteraction.action_type,
+        PuzzleInteraction.puzzle_id,
+        PuzzleInteraction.row,
+        PuzzleInteraction.col,
+        PuzzleInteraction.new_value
+    ).filter(PuzzleInteraction.user_id == user.id)
+    if before:
+        query = query.filter(PuzzleInteraction.timestamp < before)
+    interactions = query.order_by(PuzzleInteraction.timestamp.desc()).limit(100).all()
 
     return {
         "user": user.to_dict(),
         "interactions": [
             {
-                "timestamp": i.timestamp.isoformat(),
+                "timestamp": i.timestamp,
                 "action_type": i.action_type,
                 "puzzle_id": i.puzzle_id,
-                "details": f"Cell [{i.row},{i.col}] -> {i.new_value}" if i.row is not None else ""
+                "details": "" if i.row is None else _format_cell_detail(i.row, i.col, i.new_value)
             } for i in interactions
-        ]
+        ],
+        "next_before": interactions[-1].timestamp if len(interactions) == 100 else None
     }
 
 @router.get("/stats/solving")
-async def get_solving_behavior(
+@cached_sqlite(ttl=600)
+def get_solving_behavior(
     db: Session = Depends(get_db),
     admin: User = Depends(get_admin_user)
 ):
     """Analyzes solving times and user behavior."""
-    # Average solve time per difficulty
-    # This requires looking at PuzzleInteraction or Puzzle status changes
-    # Simple version: Puzzle.updated_at - Puzzle.created_at for solved puzzles
-    
-    puzzle_time_ranges = db.query(
-        PuzzleInteraction.puzzle_id,
-        func.min(PuzzleInteraction.timestamp).label("first_interaction"),
-        func.max(PuzzleInteraction.timestamp).label("last_interaction"),
-        func.count(PuzzleInteraction.id).label("total_moves")
-    ).filter(
-        PuzzleInteraction.action_type.in_(["INPUT", "DELETE", "NOTE_ADD", "NOTE_REMOVE"])
-    ).group_by(PuzzleInteraction.puzzle_id).subquery()
-    
-    # Join with Puzzle to get difficulty and status
-    solve_times = db.query(
-        Puzzle.difficulty,
-        func.avg(
-            func.strftime('%s', puzzle_time_ranges.c.last_interaction) - 
-            func.strftime('%s', puzzle_time_ranges.c.first_interaction)
-        ).label("avg_solve_seconds"),
-        func.count(Puzzle.id).label("puzzle_count"),
-        func.avg(puzzle_time_ranges.c.total_moves).label("avg_moves")
-    ).join(
-        puzzle_time_ranges, Puzzle.id == puzzle_time_ranges.c.puzzle_id
-    ).filter(
-        Puzzle.status == "solved",
-        # Ensure we have at least 2 interactions (start and end)
-        puzzle_time_ranges.c.total_moves >= 2,
-        # Ensure last interaction is after first (prevents negative times)
-        puzzle_time_ranges.c.last_interaction > puzzle_time_ranges.c.first_interaction
-    ).group_by(Puzzle.difficulty).all()
-    
-    # Move speed (duration_ms between interactions)
-    # Filter for INPUT actions
-    # Move speed (duration_ms between interactions)
-    move_speeds = db.query(
-        Puzzle.difficulty,
-        func.avg(PuzzleInteraction.duration_ms).label("avg_move_ms"),
-        func.count(PuzzleInteraction.id).label("sample_count")
-    ).join(Puzzle, PuzzleInteraction.puzzle_id == Puzzle.id).filter(
+    # All three breakdowns go out as one UNION ALL statement. Rows are told
+    # apart by the `kind` column.
+    timed_input = (
         PuzzleInteraction.action_type == "INPUT",
         PuzzleInteraction.duration_ms > 0,
         PuzzleInteraction.duration_ms < 300000  # Filter out outliers > 5 minutes (likely pauses)
-    ).group_by(Puzzle.difficulty).all()
+    )
 
-    fill_bucket_expr = cast(PuzzleInteraction.fill_count / 2, Integer)
-    
-    # Move speed per fill state (e.g. 0-25%, 25-50%, etc.)
-    # We can group by fill_count relative to total white cells.
-    # For now, let's just group by absolute fill_count buckets.
-    progress_speed = db.query(
-        fill_bucket_expr.label("bucket"),
-        func.avg(PuzzleInteraction.duration_ms).label("avg_ms"),
-        func.count(PuzzleInteraction.id).label("sample_count")
-    ).filter(
-        PuzzleInteraction.action_type == "INPUT",
-        PuzzleInteraction.duration_ms > 0,
-        PuzzleInteraction.duration_ms < 300000,  # Filter outliers
-        PuzzleInteraction.fill_count.isnot(None)
-    ).group_by(fill_bucket_expr).order_by("bucket").all()
+    no_bucket = cast(None, Integer)
+    no_difficulty = cast(None, Puzzle.difficulty.type)
+    no_moves = cast(None, Float)
+
+    stats = (
+        # Average solve time per difficulty, from the per-puzzle stats stored at solve time
+        select(
+            literal("solve").label("kind"),
+            Puzzle.difficulty.label("difficulty"),
+            no_bucket.label("bucket"),
+            cast(func.avg(Puzzle.solve_seconds), Float).label("value"),
+            func.count(Puzzle.id).label("samples"),
+            cast(func.avg(Puzzle.solve_moves), Float).label("avg_moves")
+        ).where(
+            Puzzle.status == "solved",
+            Puzzle.solve_seconds.isnot(None)
+        ).group_by(Puzzle.difficulty).union_all(
+            # Move speed (duration_ms between INPUT actions) per difficulty
+            select(
+                literal("move"),
+                Puzzle.difficulty,
+                no_bucket,
+                cast(func.avg(PuzzleInteraction.duration_ms), Float),
+                func.count(),
+                no_moves
+            ).join(Puzzle, PuzzleInteraction.puzzle_id == Puzzle.id).where(*timed_input).group_by(Puzzle.difficulty),
+            # Move speed per fill state: the stored fill_bucket column is walked in
+            # ix_puzzle_interactions_action_bucket order
+            select(
+                literal("progress"),
+                no_difficulty,
+                PuzzleInteraction.fill_bucket,
+                cast(func.avg(PuzzleInteraction.duration_ms), Float),
+                func.count(),
+                no_moves
+            ).where(*timed_input, PuzzleInteraction.fill_bucket.isnot(None)).group_by(PuzzleInteraction.fill_bucket)
+        )
+    )
+    rows = db.execute(stats).all()
+
+    solve_times = [r for r in rows if r.kind == "solve"]
+    move_speeds = [r for r in rows if r.kind == "move"]
+    progress_speed = sorted((r for r in rows if r.kind == "progress"), key=lambda r: r.bucket)
     
     # Calculate "start options" for templates
     # Simple metric: sum of (1 / number of combinations per clue) - actually clues are hard.
     # Let's just count templates by complexity (width * height * clues)
     
     return {
-        "avg_solve_times": [{"difficulty": s.difficulty, "seconds": s.avg_solve_seconds, "puzzle_count": s.puzzle_count, "avg_moves": float(s.avg_moves or 0)} for s in solve_times],
-        "avg_move_speeds": [{"difficulty": m.difficulty, "ms": m.avg_move_ms, "samples": m.sample_count} for m in move_speeds],
-        "speed_by_progress": [{"fill_bucket": int(p.bucket) * 2, "ms": p.avg_ms, "samples": p.sample_count} for p in progress_speed]
+        "avg_solve_times": [{"difficulty": s.difficulty, "seconds": s.value, "puzzle_count": s.samples, "avg_moves": float(s.avg_moves or 0)} for s in solve_times],
+        "avg_move_speeds": [{"difficulty": m.difficulty, "ms": m.value, "samples": m.samples} for m in move_speeds],
+        "speed_by_progress": [{"fill_bucket": int(p.bucket) * 2, "ms": p.value, "samples": p.samples} for p in progress_speed]
     }
 
 
+def warm_dashboard_cache(db: Session, window: int = 90):
+    """
+    Refreshes the slow dashboard panels shortly before their cache entries expire,
+    so admins keep hitting warm data. Panels nobody has opened are left alone.
+    """
+    get_performance_stats.refresh_ahead(db, window, hours=24)
+    get_solving_behavior.refresh_ahead(db, window)
+
+
 @router.get("/stats/puzzles")
-async def get_puzzle_stats(
+@cached_sqlite(ttl=600)
+def get_puzzle_stats(
     db: Session = Depends(get_db),
     admin: User = Depends(get_admin_user),
     include_anonymous: bool = True,
-    min_rating: int = 0
+    min_rating: int = 0,
+    before_rating: Optional[int] = None,
+    before_date: Optional[datetime] = None,
+    before_id: Optional[str] = None
 ):
-    """Puzzle ratings and comments analysis."""
+    """
+    Puzzle ratings and comments analysis.
+    Returns 100 puzzles; pass the returned `next_before` as `before_rating`/`before_date`/`before_id` for the next page.
+    """
+    cursor = (before_rating, before_date, before_id)
+    if any(v is not None for v in cursor) and any(v is None for v in cursor):
+        raise HTTPException(status_code=400, detail="before_rating, before_date and before_id must be passed together")
+
+    # Unrated puzzles sort as 0 so the row-value cursor never compares against NULL
+    rating = func.coalesce(Puzzle.rating, 0)
     query = db.query(
         Puzzle.id,
         Puzzle.difficulty,
-        Puzzle.rating,
+        rating.label("rating"),
         Puzzle.user_comment,
         Puzzle.created_at,
         Puzzle.updated_at,
-        User.username
+        func.coalesce(User.username, "").label("username")
     ).outerjoin(User, Puzzle.user_id == User.id)
 
     if min_rating > 0:
@@ -253,39 +332,72 @@ async def get_puzzle_stats(
     if not include_anonymous:
         query = query.filter(Puzzle.user_id.isnot(None))
 
-    puzzles = query.order_by(desc(Puzzle.rating), desc(Puzzle.created_at)).limit(100).all()
-    
-    return [
-        {
-            "id": p.id,
-            "difficulty": p.difficulty,
-            "rating": p.rating,
-            "comment": p.user_comment,
-            "date": p.created_at.isoformat(),
-            "updated_at": p.updated_at.isoformat() if p.updated_at else p.created_at.isoformat(),
-            "user": p.username or "Anonymous"
-        } for p in puzzles
-    ]
+    if before_id is not None:
+        # id breaks ties between puzzles sharing a rating and timestamp
+        query = query.filter(tuple_(rating, Puzzle.created_at, Puzzle.id) < (before_rating, before_date, before_id))
+
+    puzzles = query.order_by(desc(rating), desc(Puzzle.created_at), desc(Puzzle.id)).limit(100).all()
+    last = puzzles[-1] if len(puzzles) == 100 else None
+
+    return {
+        "puzzles": [
+            {
+                "id": p.id,
+                "difficulty": p.difficulty,
+                "rating": p.rating,
+                "comment": p.user_comment,
+                "date": p.created_at.isoformat(),
+                "updated_at": p.updated_at.isoformat() if p.updated_at else p.created_at.isoformat(),
+                "user": p.username or "Anonymous"
+            } for p in puzzles
+        ],
+        "next_before": {"rating": last.rating, "date": last.created_at.isoformat(), "id": last.id} if last else None
+    }
 
 @router.get("/puzzle/{puzzle_id}/details")
-async def get_puzzle_detail(
+def get_puzzle_detail(
     puzzle_id: str,
     db: Session = Depends(get_db),
     admin: User = Depends(get_admin_user)
 ):
     """Detailed view of a puzzle with all interactions and feedback."""
-    puzzle = db.query(Puzzle).filter(Puzzle.id == puzzle_id).outerjoin(User, Puzzle.user_id == User.id).add_columns(User.username).first()
+    # Plain row tuples for the puzzle header and its interactions: no ORM
+    # hydration or identity-map work for what can be thousands of moves
+    p_obj = db.execute(
+        select(
+            Puzzle.id,
+            Puzzle.difficulty,
+            Puzzle.rating,
+            Puzzle.difficulty_vote,
+            Puzzle.user_comment,
+            Puzzle.status,
+            Puzzle.created_at,
+            Puzzle.updated_at,
+            Puzzle.grid,
+            Puzzle.width,
+            Puzzle.height,
+            User.username
+        )
+        .outerjoin(User, Puzzle.user_id == User.id)
+        .where(Puzzle.id == puzzle_id)
+    ).first()
     
-    if not puzzle:
+    if not p_obj:
         raise HTTPException(status_code=404, detail="Puzzle not found")
-        
-    p_obj = puzzle[0] # The Puzzle model instance
-    username = puzzle[1] # The username from join
-    
-    # Fetch interactions
-    interactions = db.query(PuzzleInteraction).filter(
-        PuzzleInteraction.puzzle_id == puzzle_id
-    ).order_by(PuzzleInteraction.timestamp.asc()).all()
+
+    interactions = db.execute(
+        select(
+            PuzzleInteraction.action_type,
+            PuzzleInteraction.row,
+            PuzzleInteraction.col,
+            PuzzleInteraction.old_value,
+            PuzzleInteraction.new_value,
+            PuzzleInteraction.duration_ms,
+            PuzzleInteraction.timestamp
+        )
+        .where(PuzzleInteraction.puzzle_id == puzzle_id)
+        .order_by(PuzzleInteraction.timestamp)
+    ).all()
     
     return {
         "puzzle": {
@@ -297,7 +409,7 @@ async def get_puzzle_detail(
             "status": p_obj.status,
             "date": p_obj.created_at.isoformat() if p_obj.created_at else None,
             "updated_at": p_obj.updated_at.isoformat() if p_obj.updated_at else None,
-            "user": username or "Anonymous",
+            "user": p_obj.username or "Anonymous",
             "grid": p_obj.grid,
             "width": p_obj.width,
             "height": p_obj.height
@@ -315,32 +427,47 @@ async def get_puzzle_detail(
         ]
     }
 
-@router.get("/logs/auth")
-async def get_auth_logs(
+@functools.lru_cache(maxsize=256)
+def _parse_day(value: str) -> datetime:
+    """Parses a YYYY-MM-DD filter value; the dashboard resubmits the same few dates."""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+@router.get("/logs/auth", response_model=List[AuthLogOut])
+def get_auth_logs(
     db: Session = Depends(get_db),
     admin: User = Depends(get_admin_user),
     limit: int = 100,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    before: Optional[datetime] = None
 ):
-    """Recent authentication logs."""
-    query = db.query(AuthLog)
+    """Recent authentication logs, newest first. Pass the last row's `timestamp` as `before` to page back."""
+    query = db.query(
+        AuthLog.id,
+        AuthLog.user_id,
+        AuthLog.email,
+        AuthLog.action,
+        AuthLog.status,
+        AuthLog.ip_address,
+        AuthLog.reason,
+        AuthLog.timestamp
+    )
+    if before:
+        query = query.filter(AuthLog.timestamp < before)
 
     # Apply Date Filters
     if start_date:
         try:
             # Assumes YYYY-MM-DD coming from HTML input type="date"
-            s_date = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(AuthLog.timestamp >= s_date)
+            query = query.filter(AuthLog.timestamp >= _parse_day(start_date))
         except ValueError:
             pass
             
     if end_date:
         try:
-            e_date = datetime.strptime(end_date, "%Y-%m-%d")
-            # Set to end of day
-            e_date = e_date.replace(hour=23, minute=59, second=59)
-            query = query.filter(AuthLog.timestamp <= e_date)
+            # Half-open bound: everything before the next midnight, including
+            # entries in the last fractional second of the day
+            query = query.filter(AuthLog.timestamp < _parse_day(end_date) + timedelta(days=1))
         except ValueError:
             pass
 
@@ -349,11 +476,81 @@ async def get_auth_logs(
     if start_date or end_date:
         limit = 1000
 
-    logs = query.order_by(desc(AuthLog.timestamp)).limit(limit).all()
-    return [log.to_dict() for log in logs]
+    # Top-N walk of the auth_logs.timestamp index, no sort; rows are validated
+    # straight into AuthLogOut
+    return query.order_by(desc(AuthLog.timestamp)).limit(limit).all()
+
+def _tail_lines(path: str, lines: int, chunk_size: int = 8192) -> List[str]:
+    """Returns the last `lines` lines of a file, reading backwards in chunks like `tail -n`."""
+    if lines <= 0:
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= lines:
+            read_size = min(chunk_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            buf = f.read(read_size) + buf
+    tail = buf.splitlines(keepends=True)[-lines:]
+    return [line.decode("utf-8", errors="ignore") for line in tail]
+
+# Matches: 2023-01-01 12:00:00 or [2023-01-01...]
+_LOG_DATE_RE = re.compile(rb'(\d{4}-\d{2}-\d{2})')
+
+def _log_line_date(line: bytes) -> Optional[date]:
+    """Date of a log line, or None for undated lines (e.g. stack traces)."""
+    # Fast path: our log format starts with the asctime date ("YYYY-MM-DD ...")
+    prefix = line[:10]
+    if (len(prefix) == 10 and prefix[4] == 0x2D and prefix[7] == 0x2D
+            and prefix[:4].isdigit() and prefix[5:7].isdigit() and prefix[8:10].isdigit()):
+        digits = prefix
+    else:
+        match = _LOG_DATE_RE.search(line)
+        if not match:
+            return None
+        digits = match.group(1)
+    try:
+        return date(int(digits[:4]), int(digits[5:7]), int(digits[8:10]))
+    except ValueError:
+        return None
+
+def _first_date_from(f, offset: int) -> Optional[date]:
+    """Date of the first dated line starting at or after `offset`."""
+    if offset > 0:
+        # Step back one byte so a line starting exactly at `offset` isn't skipped
+        f.seek(offset - 1)
+        f.readline()
+    else:
+        f.seek(0)
+    for line in f:
+        line_date = _log_line_date(line)
+        if line_date is not None:
+            return line_date
+    return None
+
+def _bisect_log_offset(f, size: int, start: date) -> int:
+    """Smallest byte offset whose next dated line is on or after `start`."""
+    if start == date.min:
+        return 0
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        line_date = _first_date_from(f, mid)
+        if line_date is None or line_date >= start:
+            hi = mid
+        else:
+            lo = mid + 1
+    # Move to the first line starting at or after `lo`
+    if lo > 0:
+        f.seek(lo - 1)
+        f.readline()
+        return f.tell()
+    return 0
 
 @router.get("/logs/errors")
-async def get_error_logs(
+def get_error_logs(
     admin: User = Depends(get_admin_user),
     lines: int = 100,
     start_date: Optional[str] = None,
@@ -367,38 +564,58 @@ async def get_error_logs(
     try:
         # If no filters, return the tail to save memory
         if not start_date and not end_date:
-            with open(log_file, "r", encoding="utf-8", errors='ignore') as f:
-                # Efficiently read last N lines
-                # (Simple approach: read all if file isn't huge, or seek)
-                # For safety in python, reading lines is okay for medium files
-                all_lines = f.readlines()
-                return {"logs": all_lines[-lines:]}
+            return {"logs": _tail_lines(log_file, lines)}
 
         # Date Filtering Logic for Text Files
-        s_date = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.min
-        e_date = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59) if end_date else datetime.max
-        
-        filtered_lines = []
-        
-        # Regex to find timestamp at start of line (Adjust based on your logging config)
-        # Matches: 2023-01-01 12:00:00 or [2023-01-01...]
-        date_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})')
-        
-        with open(log_file, "r", encoding="utf-8", errors='ignore') as f:
+        s_date = _parse_day(start_date).date() if start_date else date.min
+        e_date = _parse_day(end_date).date() if end_date else date.max
+    except Exception as e:
+        return {"error": str(e)}
+
+    # A wide date range can match most of the log: stream the same {"logs": [...]}
+    # body line by line instead of collecting every matching line first
+    return StreamingResponse(_stream_log_range(log_file, s_date, e_date), media_type="application/json")
+
+def _open_log(path: str):
+    """Opens a log file (or a gzip-rotated one) for binary line reading."""
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+def _log_files(log_file: str) -> List[str]:
+    """The current log plus rotated siblings (`.1`, `.2.gz`, ...), oldest first."""
+    rotated = [p for p in glob.glob(glob.escape(log_file) + ".*") if p != log_file]
+    return sorted(rotated, key=os.path.getmtime) + [log_file]
+
+def _file_first_date(path: str) -> Optional[date]:
+    with _open_log(path) as f:
+        return _first_date_from(f, 0)
+
+def _stream_log_range(log_file: str, s_date: date, e_date: date):
+    """Yields a {"logs": [...]} JSON document with the log lines dated within [s_date, e_date]."""
+    yield b'{"logs":['
+    first = True
+    paths = _log_files(log_file)
+    for i, path in enumerate(paths):
+        if i + 1 < len(paths):
+            # Entries are monotonic across rotations: if the next file already starts
+            # before start_date, nothing in this one can match, so don't read it
+            next_first = _file_first_date(paths[i + 1])
+            if next_first is not None and next_first < s_date:
+                continue
+        with _open_log(path) as f:
+            if not path.endswith(".gz"):
+                # Jump straight to the first entry on/after start_date (gzip can't seek cheaply)
+                f.seek(_bisect_log_offset(f, os.path.getsize(path), s_date))
             for line in f:
-                match = date_pattern.search(line)
-                if match:
-                    try:
-                        line_date = datetime.strptime(match.group(1), "%Y-%m-%d")
-                        if s_date <= line_date <= e_date:
-                            filtered_lines.append(line)
-                    except:
-                        pass # If parse fails, ignore or append if it's a stack trace?
-                else:
+                line_date = _log_line_date(line)
+                if line_date is None:
                     # If line has no date (e.g. stack trace), include it if previous line was included
-                    if filtered_lines:
-                        filtered_lines.append(line)
-
-        return {"logs": filtered_lines}
-    except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+                    if first:
+                        continue
+                elif line_date > e_date:
+                    yield b"]}"
+                    return
+                elif line_date < s_date:
+                    continue
+                yield (b"" if first else b",") + orjson.dumps(line.decode("utf-8", errors="ignore"))
+                first = False
+    yield b"]}"
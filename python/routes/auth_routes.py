@@ -4,12 +4,16 @@ Handles registration, login, OAuth, email verification, and password reset.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only, raiseload
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+import hmac
+import re
 import uuid
 from datetime import datetime, timezone, timedelta
 
@@ -17,15 +21,18 @@ from python.database import get_db
 from python.models import User
 from python.auth import (
     hash_password,
-    verify_password,
+    ahash_password,
+    averify_password,
+    password_needs_rehash,
     create_access_token,
     create_refresh_token,
     generate_verification_code,
     create_password_reset_token,
     verify_password_reset_token,
-    get_current_user,
     get_current_user_and_session,
-    get_required_user,
+    get_token_claims,
+    get_required_profile,
+    invalidate_user_profile,
 )
 from python.oauth import (
     get_oauth_authorize_redirect,
@@ -39,13 +46,39 @@ from python.email_service import (
     send_welcome_email
 )
 from python.analytics import start_user_session, end_user_session
-from python.performance import log_auth_attempt, Timer
+from kakuro.performance import log_auth_attempt, Timer
 import python.config as config
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], default_response_class=ORJSONResponse)
 
 limiter = Limiter(key_func=get_remote_address)
 
+# Hashed once at import; login verifies against it when there is no real hash to check
+_DUMMY_HASH = hash_password("!invalid!")
+
+# Exactly the columns User.to_dict() reads; relationships must never load on these paths
+_PROFILE_ONLY = (
+    load_only(
+        User.id, User.email, User.username, User.email_verified, User.oauth_provider,
+        User.full_name, User.avatar_url, User.kakuros_solved, User.total_score,
+        User.is_admin, User.created_at, User.last_login,
+    ),
+    raiseload("*"),
+)
+
+# Device type from the user agent (simple heuristic); case-insensitive search, no lowered copy
+_MOBILE_RE = re.compile("mobile", re.IGNORECASE)
+
+def _detect_device(request: Request) -> str:
+    return "mobile" if _MOBILE_RE.search(request.headers.get("user-agent", "")) else "desktop"
+
+# Config is read from the environment once at startup, so resolve it here instead of per request
+_RESEND_READY = config.is_resend_configured()
+_DEBUG = config.DEBUG
+_APP_HOST = config.APP_HOST
+# Use config hours or default to 15 minutes if not set in config for codes
+_EMAIL_EXPIRE_HOURS = getattr(config, 'EMAIL_VERIFICATION_EXPIRE_HOURS', 0.25)
+
 
 # Request/Response Models
 class RegisterRequest(BaseModel):
@@ -94,15 +127,15 @@ class MessageResponse(BaseModel):
 
 
 # Registration Endpoints
-@router.post("/register", response_model=MessageResponse)
-@limiter.limit("5/minute")
-async def register(register_data: RegisterRequest, request: Request,  background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """
-    Register a new user with email and password.
-    Sends verification code via email.
-    """
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == register_data.email).first()
+def _raise_register_conflict(db: Session, register_data: RegisterRequest):
+    """Turn a failed registration INSERT into the matching 403/400 response."""
+    # Email and username collisions in one query, fetching only what the checks need
+    collision_filter = User.email == register_data.email
+    if register_data.username:
+        collision_filter = or_(collision_filter, User.username == register_data.username)
+    collisions = db.query(User.email, User.username, User.email_verified).filter(collision_filter).all()
+
+    existing_user = next((u for u in collisions if u.email == register_data.email), None)
     if existing_user:
         if not existing_user.email_verified:
             # User exists but is not verified -> Prompt for verification
@@ -118,18 +151,22 @@ async def register(register_data: RegisterRequest, request: Request,  background
     
     # Check username uniqueness if provided
     if register_data.username:
-        existing_username = db.query(User).filter(User.username == register_data.username).first()
-        if existing_username:
+        if any(u.username == register_data.username for u in collisions):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken"
             )
-    
+
+@router.post("/register", response_model=MessageResponse)
+@limiter.limit("5/minute")
+async def register(register_data: RegisterRequest, request: Request,  background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    Register a new user with email and password.
+    Sends verification code via email.
+    """
     # Generate verification code
     verification_code = generate_verification_code()
-    # Use config hours or default to 15 minutes if not set in config for codes
-    expire_hours = getattr(config, 'EMAIL_VERIFICATION_EXPIRE_HOURS', 0.25)
-    code_expires = datetime.now(timezone.utc) + timedelta(hours=expire_hours)
+    code_expires = datetime.now(timezone.utc) + timedelta(hours=_EMAIL_EXPIRE_HOURS)
     
     # Create new user
     user_id = str(uuid.uuid4())
@@ -137,27 +174,34 @@ async def register(register_data: RegisterRequest, request: Request,  background
         id=user_id,
         email=register_data.email,
         username=register_data.username,
-        password_hash=hash_password(register_data.password),
+        password_hash=await ahash_password(register_data.password),
         full_name=register_data.full_name,
         email_verified=False,
         verification_code=verification_code,
         verification_code_expires_at=code_expires
     )
     
+    # Let the unique constraints on email/username catch duplicates instead of probing first;
+    # the happy path is a single INSERT and two concurrent signups can't both pass a check
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    # Log registration
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        _raise_register_conflict(db, register_data)
+        raise
+    # No refresh: everything the response needs (id, email, code) is already in hand
+    
+    # Log registration (buffered, written by the metric flusher after the response)
     log_auth_attempt(db, register_data.email, "REGISTER", "SUCCESS", request, user_id=user_id)
     
     # Send verification email
-    if config.is_resend_configured():
+    if _RESEND_READY:
         background_tasks.add_task(send_verification_email, register_data.email, verification_code, register_data.full_name or register_data.username)
         return {"message": "Registration successful! Please check your email for a verification code."}
     else:
         # If email not configured, print code to console for dev ONLY IF DEBUG IS ON
-        if config.DEBUG:
+        if _DEBUG:
             print(f"DEV MODE: Verification code for {register_data.email} is {verification_code}")
             return {"message": f"DEV MODE: Verification code is {verification_code}"}
         else:
@@ -172,16 +216,22 @@ async def login(login_data: LoginRequest, request: Request, db: Session = Depend
     Login with email and password.
     Returns access and refresh tokens.
     """
+    now = datetime.now(timezone.utc)
+
     # Find user
     user = db.query(User).filter(User.email == login_data.email).first()
-    if not user or not user.password_hash:
+
+    # Verify password. Unknown/OAuth-only accounts are checked against a dummy hash so
+    # the miss path costs the same as a wrong password and doesn't reveal which emails exist
+    has_password = bool(user and user.password_hash)
+    password_ok = await averify_password(login_data.password, user.password_hash if has_password else _DUMMY_HASH)
+    if not has_password:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
-    # Verify password
-    if not verify_password(login_data.password, user.password_hash):
+    if not password_ok:
         log_auth_attempt(db, login_data.email, "LOGIN", "FAILURE", request, user_id=user.id, reason="Invalid password")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,32 +246,37 @@ async def login(login_data: LoginRequest, request: Request, db: Session = Depend
             detail="Please verify your email address before logging in. Check your inbox for the verification link."
         )
     
+    # Upgrade hashes made with an older work factor while we have the plaintext
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await ahash_password(login_data.password)
+
     # Update last login
-    user.last_login = datetime.now(timezone.utc)
+    user.last_login = now
 
     # --- ANALYTICS START ---
-    # Determine device type from user agent (simple heuristic)
-    ua = request.headers.get("user-agent", "").lower()
-    device_type = "mobile" if "mobile" in ua else "desktop"
-    
     # Create Database Session Record
-    session = start_user_session(db, user.id, request, device_type)
+    session = start_user_session(db, user.id, request, _detect_device(request), now=now)
     # --- ANALYTICS END ---
     
+    # Everything the response needs is loaded; read it before the commit expires it
+    user_id, user_dict, session_id = user.id, user.to_dict(), session.id
+    # last_login (+ rehash) and the session row go out in one transaction
     db.commit()
+    # The cached /me profile still carries the previous last_login
+    invalidate_user_profile(user_id)
     
     # Log successful login
-    log_auth_attempt(db, login_data.email, "LOGIN", "SUCCESS", request, user_id=user.id)
+    log_auth_attempt(db, login_data.email, "LOGIN", "SUCCESS", request, user_id=user_id)
     
     # Generate tokens
-    access_token = create_access_token(user.id, session.id)
-    refresh_token = create_refresh_token(user.id, session.id)
+    access_token = create_access_token(user_id, session_id)
+    refresh_token = create_refresh_token(user_id, session_id)
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
-        "user": user.to_dict()
+        "user": user_dict
     }
 
 @router.post("/logout", response_model=MessageResponse)
@@ -233,6 +288,8 @@ async def logout(
     Logs out the user by marking the session as ended in the database.
     """
     user, session_id = auth_data
+    if user:
+        invalidate_user_profile(user.id)
     if session_id:
         end_user_session(db, session_id)
     
@@ -263,8 +320,8 @@ async def refresh_access_token(request: RefreshTokenRequest, db: Session = Depen
             detail="Invalid token payload"
         )
     
-    # Find user
-    user = db.query(User).filter(User.id == user_id).first()
+    # Find user (profile columns only; password hash and codes stay in the database)
+    user = db.query(User).options(*_PROFILE_ONLY).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -295,121 +352,122 @@ async def verify_email(
     """
     Verify user's email address using the 6-digit code.
     """
-    # 1. Find user by email
-    user = db.query(User).filter(User.email == request_data.email).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+    now = datetime.now(timezone.utc)
+
+    # 1. Check code + expiry and mark verified in one atomic UPDATE ... RETURNING
+    user = db.scalars(
+        update(User)
+        .where(
+            User.email == request_data.email,
+            User.email_verified.is_(False),
+            User.verification_code == request_data.code,
+            or_(User.verification_code_expires_at.is_(None), User.verification_code_expires_at >= now),
         )
-    
-    # 2. Check if already verified
-    if user.email_verified:
-        # If already verified, we can just log them in again
-        pass 
+        .values(email_verified=True, verification_code=None, verification_code_expires_at=None, last_login=now)
+        .returning(User)
+    ).first()
+
+    if user:
+        # Send welcome email
+        if _RESEND_READY:
+            background_tasks.add_task(send_welcome_email, user.email, user.full_name or user.username)
     else:
-        # 3. Validate Code
-        if not user.verification_code or user.verification_code != request_data.code:
+        # 2. No match: find out why
+        user = db.query(User).filter(User.email == request_data.email).first()
+        if not user:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid verification code"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
             )
-        
-        # 4. Check Expiration
-        now = datetime.now(timezone.utc)
-        expires_at = user.verification_code_expires_at
-        if expires_at and expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
-
-        if expires_at and expires_at < now:
+
+        if not user.email_verified:
+            # Constant-time compare so response timing doesn't leak how much of the code matched
+            if not user.verification_code or not hmac.compare_digest(user.verification_code.encode(), request_data.code.encode()):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid verification code"
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Verification code has expired. Please request a new one."
             )
-        
-        # 5. Success - Mark verified and clear code
-        user.email_verified = True
-        user.verification_code = None
-        user.verification_code_expires_at = None
-        
-        # Send welcome email
-        if config.is_resend_configured():
-            background_tasks.add_task(send_welcome_email, user.email, user.full_name or user.username)
-        
-    # 6. Auto-Login Logic (Create Session)
-    user.last_login = datetime.now(timezone.utc)
-    
-    ua = request.headers.get("user-agent", "").lower()
-    device_type = "mobile" if "mobile" in ua else "desktop"
-    session = start_user_session(db, user.id, request, device_type)
+
+        # Already verified: we can just log them in again
+        user.last_login = now
+
+    # 3. Auto-Login Logic (Create Session)
+    # The row is fully loaded here; snapshot it before the commits expire the instance
+    user_id, user_dict = user.id, user.to_dict()
+    session_id = start_user_session(db, user_id, request, _detect_device(request), now=now).id
 
     # Log verification login
-    log_auth_attempt(db, user.email, "EMAIL_VERIFICATION_LOGIN", "SUCCESS", request, user_id=user.id)
+    log_auth_attempt(db, user_dict["email"], "EMAIL_VERIFICATION_LOGIN", "SUCCESS", request, user_id=user_id)
 
     db.commit()
-    # 6. Generate Tokens (Auto-Login)
-    access_token = create_access_token(user.id, session.id)
-    refresh_token = create_refresh_token(user.id, session.id)
+    # email_verified / last_login changed; drop the cached /me profile
+    invalidate_user_profile(user_id)
+    # 4. Generate Tokens (Auto-Login)
+    access_token = create_access_token(user_id, session_id)
+    refresh_token = create_refresh_token(user_id, session_id)
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
-        "user": user.to_dict()
+        "user": user_dict
     }
 
 @router.post("/resend-verification", response_model=MessageResponse)
 @limiter.limit("5/minute")
-async def resend_verification(request: ResendVerificationRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def resend_verification(request_data: ResendVerificationRequest, request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Resend verification code to user.
     """
+    now = datetime.now(timezone.utc)
+
     # Find user
-    user = db.query(User).filter(User.email == request.email).first()
+    user = db.query(User).filter(User.email == request_data.email).first()
     if not user:
         # Don't reveal if email exists (security best practice)
-        log_auth_attempt(db, request.email, "RESEND_VERIFICATION", "FAILURE", request, reason="User not found")
+        log_auth_attempt(db, request_data.email, "RESEND_VERIFICATION", "FAILURE", request, reason="User not found")
         return {"message": "If an account exists with this email, a verification code has been sent."}
     
     # Check if already verified
     if user.email_verified:
-        log_auth_attempt(db, request.email, "RESEND_VERIFICATION", "FAILURE", request, reason="Email already verified")
+        log_auth_attempt(db, request_data.email, "RESEND_VERIFICATION", "FAILURE", request, reason="Email already verified")
         return {"message": "This email is already verified. You can log in now."}
     
-    # Generate new verification code
-    expire_hours = getattr(config, 'EMAIL_VERIFICATION_EXPIRE_HOURS', 1.0)
-
     current_expires_at = user.verification_code_expires_at
-    if current_expires_at.tzinfo is None:
+    if current_expires_at is not None and current_expires_at.tzinfo is None:
         current_expires_at = current_expires_at.replace(tzinfo=timezone.utc)
 
-
     # The time the current code was created is (Expires - Lifetime)
     # Using timedelta to reverse check
-    created_at = current_expires_at - timedelta(hours=expire_hours)
+    created_at = current_expires_at - timedelta(hours=_EMAIL_EXPIRE_HOURS) if current_expires_at else None
     
     # If the code was created less than 60 seconds ago, block the request
-    if (now - created_at).total_seconds() < 60:
-        log_auth_attempt(db, request.email, "RESEND_VERIFICATION", "FAILURE", request, reason="Too many requests")
+    if created_at and (now - created_at).total_seconds() < 60:
+        log_auth_attempt(db, request_data.email, "RESEND_VERIFICATION", "FAILURE", request, reason="Too many requests")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Please wait 60 seconds before requesting a new code."
         )
     
+    # Generate new verification code
     verification_code = generate_verification_code()
-    code_expires = datetime.now(timezone.utc) + timedelta(hours=expire_hours)
+    code_expires = now + timedelta(hours=_EMAIL_EXPIRE_HOURS)
     
     user.verification_code = verification_code
     user.verification_code_expires_at = code_expires
     db.commit()
     
     # Send verification email
-    if config.is_resend_configured():
-        log_auth_attempt(db, request.email, "RESEND_VERIFICATION", "SUCCESS", request, reason="Verification code resent")
+    if _RESEND_READY:
+        log_auth_attempt(db, request_data.email, "RESEND_VERIFICATION", "SUCCESS", request, reason="Verification code resent")
         background_tasks.add_task(send_verification_email, user.email, verification_code, user.full_name or user.username)
     else:
-        log_auth_attempt(db, request.email, "RESEND_VERIFICATION", "FAILURE", request, reason="Email service not configured")
-        if config.DEBUG:
+        log_auth_attempt(db, request_data.email, "RESEND_VERIFICATION", "FAILURE", request, reason="Email service not configured")
+        if _DEBUG:
             print(f"DEV MODE: Resent verification code for {user.email}: {verification_code}")
     
     return {"message": "If an account exists with this email, a verification code has been sent."}
@@ -431,12 +489,12 @@ async def forgot_password(request_data: ForgotPasswordRequest, request: Request,
     
     # Send password reset email
     reset_token = create_password_reset_token(user.id, user.email)
-    if config.is_resend_configured():
+    if _RESEND_READY:
         background_tasks.add_task(send_password_reset_email, user.email, reset_token, user.full_name or user.username)
         log_auth_attempt(db, request_data.email, "FORGOT_PASSWORD", "SUCCESS", request, reason="Password reset email sent")
     else:
         log_auth_attempt(db, request_data.email, "FORGOT_PASSWORD", "FAILURE", request, reason="Email service not configured")
-        print(f"DEV MODE: Password reset email with link: {config.APP_HOST}/reset-password?token={reset_token}")
+        print(f"DEV MODE: Password reset email with link: {_APP_HOST}/reset-password?token={reset_token}")
 
     
     return {"message": "If an account exists with this email, a password reset link has been sent."}
@@ -467,7 +525,7 @@ async def reset_password(request_data: ResetPasswordRequest, request: Request, d
         )
     
     # Update password
-    user.password_hash = hash_password(request_data.new_password)
+    user.password_hash = await ahash_password(request_data.new_password)
     db.commit()
     
     log_auth_attempt(db, user.email, "RESET_PASSWORD", "SUCCESS", request, reason="Password reset successful")
@@ -541,6 +599,7 @@ async def handle_oauth_user(user_info: dict, db: Session, request: Request) -> A
     provider = user_info['provider']
     oauth_id = user_info['oauth_id']
     email = user_info['email']
+    now = datetime.now(timezone.utc)
     
     # Try to find existing user by OAuth ID
     user = db.query(User).filter(
@@ -570,43 +629,44 @@ async def handle_oauth_user(user_info: dict, db: Session, request: Request) -> A
             db.add(user)
     
     # Update last login
-    user.last_login = datetime.now(timezone.utc)
+    user.last_login = now
 
-    ua = request.headers.get("user-agent", "").lower()
-    device_type = "mobile" if "mobile" in ua else "desktop"
-    session = start_user_session(db, user.id, request, device_type)
-    
+    # Write the user now so column defaults are filled in client-side, and snapshot the
+    # profile before the commit expires it (no refresh SELECT needed)
+    db.flush()
+    user_id, user_dict = user.id, user.to_dict()
+
+    session_id = start_user_session(db, user_id, request, _detect_device(request), now=now).id
     db.commit()
-    db.refresh(user)
+    # Linking may have set email_verified, and last_login moved; drop the cached /me profile
+    invalidate_user_profile(user_id)
 
     # Log successful OAuth login
-    log_auth_attempt(db, email, f"{provider.upper()}_LOGIN", "SUCCESS", request, user_id=user.id)
+    log_auth_attempt(db, email, f"{provider.upper()}_LOGIN", "SUCCESS", request, user_id=user_id)
     
     # Generate tokens
-    access_token = create_access_token(user.id, session.id)
-    refresh_token = create_refresh_token(user.id, session.id)
+    access_token = create_access_token(user_id, session_id)
+    refresh_token = create_refresh_token(user_id, session_id)
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
-        "user": user.to_dict()
+        "user": user_dict
     }
 
 
 # User Info Endpoints
 @router.get("/me")
-async def get_me(current_user: User = Depends(get_required_user)):
+async def get_me(profile: dict = Depends(get_required_profile)):
     """Get current user's profile."""
-    return current_user.to_dict()
+    return profile
 
 
 @router.get("/check")
-async def check_auth(current_user: Optional[User] = Depends(get_current_user)):
-    """Check if user is authenticated (optional dependency)."""
-    if current_user:
-        return {
-            "authenticated": True,
-            "user": current_user.to_dict()
-        }
-    return {"authenticated": False}
\ No newline at end of file
+async def check_auth(claims: Optional[dict] = Depends(get_token_claims)):
+    """
+    Check if the caller holds a valid token (signature and expiry only, no DB lookup).
+    Use /auth/me for the profile.
+    """
+    return {"authenticated": claims is not None}
\ No newline at end of file
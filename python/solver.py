@@ -1,16 +1,202 @@
 from collections import deque
-from typing import List, Dict, Set, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Callable, List, Dict, Set, Optional, Tuple
 from .kakuro import KakuroBoard, Cell, CellType
 from .difficulty_estimator import KakuroDifficultyEstimator
 import copy
+import multiprocessing
+import os
 import random
 import logging
+import threading
 
 logger = logging.getLogger("kakuro_solver")
 
+def _build_partition_table() -> List[List[int]]:
+    """
+    table[sum][length] = number of sets of `length` distinct digits 1-9 adding up to `sum`.
+    Built by walking all 512 subsets of {1..9} as bitmasks.
+    """
+    table = [[0] * 10 for _ in range(46)]
+    for mask in range(1 << 9):
+        digits = [d + 1 for d in range(9) if mask >> d & 1]
+        table[sum(digits)][len(digits)] += 1
+    return table
+
+_PARTITION_TABLE = _build_partition_table()
+
+def _build_combination_masks() -> List[List[int]]:
+    """
+    masks[sum][length] = bitmask (bit d = digit d) of the digits that appear in at
+    least one set of `length` distinct digits 1-9 adding up to `sum`.
+    """
+    masks = [[0] * 10 for _ in range(46)]
+    for mask in range(1 << 9):
+        digits = [d + 1 for d in range(9) if mask >> d & 1]
+        masks[sum(digits)][len(digits)] |= mask << 1
+    return masks
+
+_COMBINATION_MASKS = _build_combination_masks()
+
+def _combination_mask(remaining_sum: int, remaining_cells: int) -> int:
+    """Digits that can still appear in a sector needing remaining_sum over remaining_cells cells."""
+    if 0 <= remaining_sum <= 45 and 0 <= remaining_cells <= 9:
+        return _COMBINATION_MASKS[remaining_sum][remaining_cells]
+    return 0
+
+def _build_remaining_sum_tables() -> Tuple[List[List[Optional[int]]], List[List[Optional[int]]]]:
+    """
+    min_sums[mask][k] / max_sums[mask][k] = sum of the k smallest / largest digits
+    whose bit is NOT set in `mask` (digit d is bit d), or None if fewer than k remain.
+    """
+    min_sums, max_sums = [], []
+    for mask in range(1 << 10):
+        available = [d for d in range(1, 10) if not mask >> d & 1]
+        min_sums.append([sum(available[:k]) if k <= len(available) else None for k in range(10)])
+        max_sums.append([sum(available[len(available) - k:]) if k <= len(available) else None for k in range(10)])
+    return min_sums, max_sums
+
+_MIN_REMAINING_SUM, _MAX_REMAINING_SUM = _build_remaining_sum_tables()
+
+def _lookup_partitions(target_sum: int, length: int) -> int:
+    if 0 <= target_sum <= 45 and 0 <= length <= 9:
+        return _PARTITION_TABLE[target_sum][length]
+    return 0
+
+@lru_cache(maxsize=1 << 16)
+def _score_partition_state(current_sum: int, filled_count: int, sector_length: int,
+                           used_mask: int, preference: str) -> float:
+    """
+    How "easy" a sector state makes its clue once the candidate digit is placed.
+    Returns a score where LOWER is better (fewer partitions). The score depends
+    only on these values, so sibling branches of the backtracking tree share
+    one computation.
+    """
+    # If this completes the sector, count actual partitions
+    if filled_count == sector_length:
+        num_partitions = _lookup_partitions(current_sum, sector_length)
+
+        if preference == "unique":
+            # Strongly prefer 1-2 partitions, heavily penalize >3
+            if num_partitions == 1:
+                return 0.0  # Perfect!
+            elif num_partitions == 2:
+                return 1.0
+            elif num_partitions <= 4:
+                return 5.0
+            else:
+                return 20.0  # Very bad
+
+        elif preference == "few":
+            # Prefer 1-4 partitions, penalize >6
+            if num_partitions <= 2:
+                return 0.0
+            elif num_partitions <= 4:
+                return 2.0
+            elif num_partitions <= 6:
+                return 5.0
+            else:
+                return 15.0
+
+    else:
+        # Sector not complete yet - estimate difficulty
+        # Calculate what range of sums are possible
+        remaining_count = sector_length - filled_count
+
+        # Minimum / maximum possible final sum (smallest / largest available digits)
+        min_remaining = _MIN_REMAINING_SUM[used_mask][remaining_count]
+        if min_remaining is None:
+            return 100.0  # Impossible - will be pruned by consistency check
+        max_remaining = _MAX_REMAINING_SUM[used_mask][remaining_count]
+
+        min_final_sum = current_sum + min_remaining
+        max_final_sum = current_sum + max_remaining
+
+        # Estimate average partition count in this range
+        # For efficiency, sample a few sums in the range
+        sample_sums = []
+        if min_final_sum == max_final_sum:
+            sample_sums = [min_final_sum]
+        else:
+            step = max(1, (max_final_sum - min_final_sum) // 3)
+            sample_sums = list(range(min_final_sum, max_final_sum + 1, step))
+
+        partition_counts = [_lookup_partitions(s, sector_length) for s in sample_sums]
+        avg_partitions = sum(partition_counts) / len(partition_counts) if partition_counts else 10
+
+        # Return a "potential difficulty" score
+        if preference == "unique":
+            if avg_partitions <= 2:
+                return 1.0
+            elif avg_partitions <= 4:
+                return 3.0
+            else:
+                return 8.0
+
+        elif preference == "few":
+            if avg_partitions <= 4:
+                return 1.0
+            elif avg_partitions <= 6:
+                return 3.0
+            else:
+                return 6.0
+
+    return 5.0  # Default neutral score
+
+_NEIGHBOR_OFFSETS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+_DIGITS = (1, 2, 3, 4, 5, 6, 7, 8, 9)
+_ALL_DIGITS_MASK = 0b1111111110  # Bits 1-9
+
+# Digit weights and partition preference used by solve_fill, per difficulty
+_DIFFICULTY_SETTINGS = {
+    "very_easy": ((20, 15, 5, 1, 1, 1, 5, 15, 20), "unique"),  # Prefer unique partitions
+    "easy": ((10, 8, 6, 2, 1, 2, 6, 8, 10), "few"),  # Prefer few partitions (1-3)
+    "medium": ((5, 5, 5, 5, 5, 5, 5, 5, 5), None),  # No preference
+    "hard": ((1, 2, 5, 10, 10, 10, 5, 2, 1), None),
+}
+
+# Process pool shared by all generate_puzzle_concurrent calls; created on first use.
+# Calls are serialized, and each one is a numbered round: its workers stop at the
+# next topology attempt once _cancelled_round reaches their round number.
+_gen_pool: Optional[ProcessPoolExecutor] = None
+_gen_pool_lock = threading.Lock()
+_gen_round = 0
+_cancelled_round = None  # multiprocessing.Value, shared with the workers
+
+def _init_worker(cancelled_round):
+    global _cancelled_round
+    _cancelled_round = cancelled_round
+
+def _get_gen_pool() -> ProcessPoolExecutor:
+    global _gen_pool, _cancelled_round
+    if _gen_pool is None:
+        _cancelled_round = multiprocessing.Value("i", 0, lock=False)
+        _gen_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        initializer=_init_worker, initargs=(_cancelled_round,))
+    return _gen_pool
+
+def _generate_in_worker(width: int, height: int, difficulty: str, seed: int, round_id: int):
+    """
+    Runs one full generate_puzzle pipeline in a worker process.
+    Returns the finished grid as (type, value, clue_h, clue_v) rows, or None.
+    """
+    random.seed(seed)
+    board = KakuroBoard(width, height)
+    solver = CSPSolver(board)
+    solver.should_stop = lambda: _cancelled_round.value >= round_id
+    if not solver.generate_puzzle(difficulty):
+        return None
+    return [[(c.type.value, c.value, c.clue_h, c.clue_v) for c in row] for row in board.grid]
+
+
 class CSPSolver:
     def __init__(self, board: KakuroBoard):
         self.board = board
+        # Polled between topology attempts; generate_puzzle gives up once it returns True
+        self.should_stop: Optional[Callable[[], bool]] = None
 
     def generate_random_puzzle(self):
         """
@@ -86,6 +272,10 @@ class CSPSolver:
         MAX_VALUE_RETRIES = 5   # How many times we try to fill values before giving up
         
         for topo_attempt in range(MAX_TOPOLOGY_RETRIES):
+            if self.should_stop is not None and self.should_stop():
+                logger.info(f"Generation cancelled before topology attempt {topo_attempt}")
+                return False
+
             # 1. Generate Topology
             d = 0.60
             if difficulty == "very_easy": d = 0.50
@@ -132,14 +322,13 @@ class CSPSolver:
                     # Calculate Clues based on this fill
                     self.calculate_clues()
                     
-                    # Check Uniqueness using the clues
-                    is_unique, alt_sol = self.check_uniqueness(random_seed=fill_attempt)
+                    # Check Uniqueness using the clues (double check with a second seed)
+                    is_unique, alt_sol = self._check_uniqueness_batch((fill_attempt, fill_attempt + 100))
                     
                     if is_unique:
-                        if self.check_uniqueness(random_seed=fill_attempt + 100)[0]:
-                            logger.info(f"Success! Unique puzzle generated (Topo {topo_attempt}, Fill {fill_attempt})")
-                          
-                            return True
+                        logger.info(f"Success! Unique puzzle generated (Topo {topo_attempt}, Fill {fill_attempt})")
+                      
+                        return True
                     
                     last_ambiguity = alt_sol
                     
@@ -152,16 +341,13 @@ class CSPSolver:
                 # 3. Calculate Clues based on the fill
                 self.calculate_clues()
                 
-                # Check Uniqueness
-                is_unique, alt_sol = self.check_uniqueness(random_seed=fill_attempt)
+                # Check Uniqueness (double check with a second seed)
+                is_unique, alt_sol = self._check_uniqueness_batch((fill_attempt, fill_attempt + 100))
                     
                 if is_unique:
-                    # Double check
-                    is_unique_2, _ = self.check_uniqueness(random_seed=fill_attempt + 100)
-                    if is_unique_2:
-                        logger.info(f"Success! Unique puzzle generated (Topo {topo_attempt}, Fill {fill_attempt})")
-                       
-                        return True
+                    logger.info(f"Success! Unique puzzle generated (Topo {topo_attempt}, Fill {fill_attempt})")
+                   
+                    return True
                     
                 # Not unique - record the ambiguity for the next 'Targeted Fill' attempt
                 last_ambiguity = alt_sol
@@ -197,6 +383,53 @@ class CSPSolver:
             
         return False
 
+    def generate_puzzle_concurrent(self, difficulty: str = "medium", workers: Optional[int] = None) -> bool:
+        """
+        Runs independent generate_puzzle pipelines in worker processes, each with
+        its own RNG seed, and loads the first puzzle that succeeds into this board.
+        The remaining workers are cancelled and stop at their next topology attempt.
+        """
+        global _gen_pool, _gen_round
+        workers = workers or os.cpu_count() or 1
+        base_seed = random.getrandbits(32)
+        with _gen_pool_lock:
+            pool = _get_gen_pool()
+            _gen_round += 1
+            round_id = _gen_round
+            futures = []
+            try:
+                futures = [pool.submit(_generate_in_worker, self.board.width, self.board.height,
+                                       difficulty, base_seed + i, round_id)
+                           for i in range(workers)]
+                for future in as_completed(futures):
+                    try:
+                        grid = future.result()
+                    except BrokenProcessPool as e:
+                        logger.error(f"Generation pool broke: {e}")
+                        _gen_pool = None
+                        return False
+                    except Exception as e:
+                        logger.error(f"Generation worker failed: {e}")
+                        continue
+                    if grid is not None:
+                        self._load_grid(grid)
+                        return True
+                return False
+            finally:
+                _cancelled_round.value = round_id
+                for future in futures:
+                    future.cancel()
+
+    def _load_grid(self, grid: List[List[Tuple[str, Optional[int], Optional[int], Optional[int]]]]):
+        for row, cells in zip(self.board.grid, grid):
+            for cell, (cell_type, value, clue_h, clue_v) in zip(row, cells):
+                cell.type = CellType(cell_type)
+                cell.value = value
+                cell.clue_h = clue_h
+                cell.clue_v = clue_v
+        self.board._collect_white_cells()
+        self.board._identify_sectors()
+
     def _repair_topology_robust(self, alt_sol: Dict[Tuple[int, int], int]) -> bool:
         """
         Surgically alters the board to resolve ambiguity.
@@ -211,13 +444,17 @@ class CSPSolver:
         if not diff_cells: return False
 
         # 2. Sort by Connectivity Safety
-        # Remove "Hubs" first (3-4 neighbors), check "Bridges" (1-2 neighbors) last.
-        # This increases the chance that the graph stays connected.
+        # Cut vertices go last: blocking one splits the white graph unless the
+        # cascade prunes the cut-off part. Among the rest, remove "Hubs" first
+        # (3-4 neighbors) and "Bridges" (1-2 neighbors) last.
+        # This increases the chance that the first candidate passes validation.
+        cut_vertices = self._articulation_points()
         random.shuffle(diff_cells) # Add randomness so we don't always pick top-left
-        diff_cells.sort(key=lambda c: self._count_white_neighbors(c), reverse=True)
+        diff_cells.sort(key=lambda c: ((c.r, c.c) not in cut_vertices, self._count_white_neighbors(c)),
+                        reverse=True)
 
-        # Snapshot grid types for rollback
-        original_types = [row[:] for row in [[c.type for c in r] for r in self.board.grid]]
+        # Snapshot white cells for rollback (the transaction only ever blocks cells)
+        original_white = [c for row in self.board.grid for c in row if c.type == CellType.WHITE]
         
         for target in diff_cells:
             # Transaction Start
@@ -255,19 +492,106 @@ class CSPSolver:
                 return True # Commit Transaction
             
             # Rollback Transaction
-            for r in range(self.board.height):
-                for c in range(self.board.width):
-                    self.board.grid[r][c].type = original_types[r][c]
-            self.board._collect_white_cells()
+            for c in original_white:
+                c.type = CellType.WHITE
+            self.board.white_cells = original_white[:]
             
         return False
 
+    def _index_cells(self) -> List[int]:
+        """
+        Numbers the current white cells and caches, per cell, the indices of its
+        sector peers and the ids of its two sectors. Caches each sector's clue,
+        resets the per-sector digit masks, sums and fill counts and returns an
+        empty value list (0 = unassigned) for the solver.
+        Must run per solve: topology repairs change the white cells and sectors.
+        """
+        cells = self.board.white_cells
+        for row in self.board.grid:
+            for c in row:
+                c.idx = -1
+        for i, c in enumerate(cells):
+            c.idx = i
+            c.sector_h_id = c.sector_v_id = -1
+        # Peers that have since been blocked keep no slot
+        for c in cells:
+            c.sector_h_idx = tuple(x.idx for x in c.sector_h if x.idx >= 0) if c.sector_h else ()
+            c.sector_v_idx = tuple(x.idx for x in c.sector_v if x.idx >= 0) if c.sector_v else ()
+        for s, sector in enumerate(self.board.sectors_h):
+            for c in sector:
+                c.sector_h_id = s
+        for s, sector in enumerate(self.board.sectors_v):
+            for c in sector:
+                c.sector_v_id = s
+        grid = self.board.grid
+        self._clue_h = [grid[s[0].r][s[0].c - 1].clue_h for s in self.board.sectors_h]
+        self._clue_v = [grid[s[0].r - 1][s[0].c].clue_v for s in self.board.sectors_v]
+        # Bit v is set while digit v is placed somewhere in the sector
+        self._used_h = [0] * len(self.board.sectors_h)
+        self._used_v = [0] * len(self.board.sectors_v)
+        # Running sum and number of placed digits per sector
+        self._sum_h = [0] * len(self.board.sectors_h)
+        self._sum_v = [0] * len(self.board.sectors_v)
+        self._filled_h = [0] * len(self.board.sectors_h)
+        self._filled_v = [0] * len(self.board.sectors_v)
+        return [0] * len(cells)
+
+    def _used_digits(self, cell: Cell) -> int:
+        """Mask of digits already placed in either of the cell's sectors."""
+        return ((self._used_h[cell.sector_h_id] if cell.sector_h_id >= 0 else 0)
+                | (self._used_v[cell.sector_v_id] if cell.sector_v_id >= 0 else 0))
+
+    def _candidate_mask(self, cell: Cell) -> int:
+        """
+        Bitmask (bit v = digit v) of the values _is_consistent_number accepts for
+        the cell with clues enforced, computed from the per-sector state in O(1).
+        """
+        mask = _ALL_DIGITS_MASK & ~self._used_digits(cell)
+        if cell.sector_h:
+            s = cell.sector_h_id
+            if self._clue_h[s] is None: return 0
+            mask &= _combination_mask(self._clue_h[s] - self._sum_h[s], len(cell.sector_h) - self._filled_h[s])
+        if cell.sector_v:
+            s = cell.sector_v_id
+            if self._clue_v[s] is None: return 0
+            mask &= _combination_mask(self._clue_v[s] - self._sum_v[s], len(cell.sector_v) - self._filled_v[s])
+        return mask
+
+    def _assign(self, var: Cell, value: int, values: List[int]):
+        values[var.idx] = value
+        bit = 1 << value
+        s = var.sector_h_id
+        if s >= 0:
+            self._used_h[s] |= bit
+            self._sum_h[s] += value
+            self._filled_h[s] += 1
+        s = var.sector_v_id
+        if s >= 0:
+            self._used_v[s] |= bit
+            self._sum_v[s] += value
+            self._filled_v[s] += 1
+
+    def _unassign(self, var: Cell, values: List[int]):
+        value = values[var.idx]
+        values[var.idx] = 0
+        bit = 1 << value
+        s = var.sector_h_id
+        if s >= 0:
+            self._used_h[s] ^= bit
+            self._sum_h[s] -= value
+            self._filled_h[s] -= 1
+        s = var.sector_v_id
+        if s >= 0:
+            self._used_v[s] ^= bit
+            self._sum_v[s] -= value
+            self._filled_v[s] -= 1
+
     def solve_fill(self, difficulty: str = "medium", 
                max_nodes: int = 50000, 
                initial_constraints: Dict[Tuple[int, int], int] = None,
                ignore_clues: bool = False) -> bool:
         """Backtracking to fill the grid with valid numbers 1-9."""
-        assignment = {}
+        values = self._index_cells()
         node_count = [0]
 
         # Apply initial constraints
@@ -276,115 +600,93 @@ class CSPSolver:
                 cell = self.board.grid[r][c]
                 if cell.type == CellType.WHITE:
                     # Verify consistency before assigning
-                    if self._is_consistent_number(cell, val, assignment, ignore_clues):
-                        assignment[cell] = val
+                    if self._is_consistent_number(cell, val, values, ignore_clues):
+                        self._assign(cell, val, values)
                     else:
                         # Constraints were impossible
                         return False
         
         # Difficulty settings
-        if difficulty == "very_easy":
-            domain_weights = [20, 15, 5, 1, 1, 1, 5, 15, 20]
-            partition_preference = "unique"  # NEW: Prefer unique partitions
-            
-        elif difficulty == "easy":
-            domain_weights = [10, 8, 6, 2, 1, 2, 6, 8, 10]
-            partition_preference = "few"  # NEW: Prefer few partitions (1-3)
-            
-        elif difficulty == "medium":
-            domain_weights = [5, 5, 5, 5, 5, 5, 5, 5, 5]
-            partition_preference = None  # No preference
-            
-        elif difficulty == "hard":
-            domain_weights = [1, 2, 5, 10, 10, 10, 5, 2, 1]
-            partition_preference = None
-            
-        else:
-            domain_weights = [5, 5, 5, 5, 5, 5, 5, 5, 5]
-            partition_preference = None
+        domain_weights, partition_preference = _DIFFICULTY_SETTINGS.get(difficulty, _DIFFICULTY_SETTINGS["medium"])
             
-        return self._backtrack_fill(assignment, node_count, max_nodes, domain_weights, 
+        return self._backtrack_fill(values, node_count, max_nodes, domain_weights, 
                                 ignore_clues, partition_preference)
 
 
     
-    def _backtrack_fill(self, assignment: Dict[Cell, int], node_count: List[int], 
-                   max_nodes: int, weights: List[int], ignore_clues: bool = False,
+    def _backtrack_fill(self, values: List[int], node_count: List[int], 
+                   max_nodes: int, weights: Tuple[int, ...], ignore_clues: bool = False,
                    partition_preference: str = None) -> bool:
         if node_count[0] > max_nodes: 
             return False
         node_count[0] += 1
 
-        # MRV Heuristic
-        unassigned = [c for c in self.board.white_cells if c not in assignment]
-        if not unassigned:
+        # MRV Heuristic: the unassigned cell with the most filled sector peers,
+        # read from the per-sector fill counts (first such cell on ties)
+        filled_h, filled_v = self._filled_h, self._filled_v
+        var = None
+        best = -1
+        for c in self.board.white_cells:
+            if values[c.idx]:
+                continue
+            degree = ((filled_h[c.sector_h_id] if c.sector_h_id >= 0 else 0)
+                      + (filled_v[c.sector_v_id] if c.sector_v_id >= 0 else 0))
+            if degree > best:
+                var, best = c, degree
+        if var is None:
             # FINAL VALIDATION for easy puzzles: Check if clues are actually easy
             if partition_preference and not ignore_clues:
-                if not self._validate_partition_difficulty(assignment, partition_preference):
+                if not self._validate_partition_difficulty(values, partition_preference):
                     return False  # Reject this solution, backtrack
             
             # Apply assignment to board
-            for cell, val in assignment.items():
-                cell.value = val
+            for cell in self.board.white_cells:
+                cell.value = values[cell.idx]
             return True
-            
-        var = max(unassigned, key=lambda c: self._count_neighbors_filled(c, assignment))
         
         if partition_preference:
-            ordered_domain = self._get_partition_aware_domain(var, assignment, partition_preference, weights)
+            ordered_domain = self._get_partition_aware_domain(var, values, partition_preference, weights)
         else:
-            # Original approach
-            nums = [1, 2, 3, 4, 5, 6, 7, 8, 9]
-            weighted_pairs = list(zip(nums, weights))
-            random.shuffle(weighted_pairs)
-            weighted_pairs.sort(key=lambda x: x[1] * random.random(), reverse=True)
-            ordered_domain = [x[0] for x in weighted_pairs]
+            # Original approach: weighted random order in a single keyed sort
+            ordered_domain = sorted(_DIGITS, key=lambda d: weights[d - 1] * random.random(), reverse=True)
+
+        # Without clues only the duplicate rule applies, which is one mask test
+        used = self._used_digits(var) if ignore_clues else 0
 
         for val in ordered_domain:
-            if self._is_consistent_number(var, val, assignment, ignore_clues):
-                assignment[var] = val
-                if self._backtrack_fill(assignment, node_count, max_nodes, weights, 
-                                   ignore_clues, partition_preference):
-                    return True
-                del assignment[var]
+            if ignore_clues:
+                if used >> val & 1: continue
+            elif not self._is_consistent_number(var, val, values):
+                continue
+            self._assign(var, val, values)
+            if self._backtrack_fill(values, node_count, max_nodes, weights, 
+                               ignore_clues, partition_preference):
+                return True
+            self._unassign(var, values)
         
         return False
 
-    def _validate_partition_difficulty(self, assignment: Dict[Cell, int], 
+    def _validate_partition_difficulty(self, values: List[int], 
                                     preference: str) -> bool:
         """
         Check if the filled puzzle has appropriate partition difficulty.
         For 'unique': At least 80% of clues should have <=2 partitions
         For 'few': At least 60% of clues should have <=4 partitions
+        Reads the per-sector sums and fill counts kept by _assign/_unassign.
         """
+        max_partitions = {"unique": 2, "few": 4}.get(preference, 0)
         easy_clue_count = 0
         total_clue_count = 0
         
-        # Check horizontal sectors
-        for sector in self.board.sectors_h:
-            if not all(c in assignment for c in sector):
-                continue
-            total_clue_count += 1
-            clue_sum = sum(assignment[c] for c in sector)
-            num_partitions = self._count_partitions(clue_sum, len(sector))
-            
-            if preference == "unique" and num_partitions <= 2:
-                easy_clue_count += 1
-            elif preference == "few" and num_partitions <= 4:
-                easy_clue_count += 1
-        
-        # Check vertical sectors
-        for sector in self.board.sectors_v:
-            if not all(c in assignment for c in sector):
-                continue
-            total_clue_count += 1
-            clue_sum = sum(assignment[c] for c in sector)
-            num_partitions = self._count_partitions(clue_sum, len(sector))
-            
-            if preference == "unique" and num_partitions <= 2:
-                easy_clue_count += 1
-            elif preference == "few" and num_partitions <= 4:
-                easy_clue_count += 1
+        for sectors, sums, filled in ((self.board.sectors_h, self._sum_h, self._filled_h),
+                                      (self.board.sectors_v, self._sum_v, self._filled_v)):
+            for s, sector in enumerate(sectors):
+                length = len(sector)
+                if filled[s] != length:
+                    continue
+                total_clue_count += 1
+                if _lookup_partitions(sums[s], length) <= max_partitions:
+                    easy_clue_count += 1
         
         if total_clue_count == 0:
             return True
@@ -398,8 +700,8 @@ class CSPSolver:
         
         return True
 
-    def _get_partition_aware_domain(self, cell: Cell, assignment: Dict[Cell, int], 
-                                    preference: str, weights: List[int]) -> List[int]:
+    def _get_partition_aware_domain(self, cell: Cell, values: List[int], 
+                                    preference: str, weights: Tuple[int, ...]) -> List[int]:
         """
         Returns an ordered domain that prefers values leading to easy partitions.
         
@@ -409,183 +711,63 @@ class CSPSolver:
         3. Prioritize values that lead to sums with fewer partitions
         """
         candidates = []
+        used = self._used_digits(cell)
+        # Sector states do not depend on the candidate, so read them once
+        h_state = self._sector_state(cell, 'h')
+        v_state = self._sector_state(cell, 'v')
         
-        for val in range(1, 10):
+        for val in _DIGITS:
             # Quick duplicate check
-            if cell.sector_h:
-                if any(assignment.get(c) == val for c in cell.sector_h):
-                    continue
-            if cell.sector_v:
-                if any(assignment.get(c) == val for c in cell.sector_v):
-                    continue
+            if used >> val & 1:
+                continue
             
             # Calculate partition scores for both directions
-            h_score = self._calculate_partition_score(cell, val, assignment, 'h', preference)
-            v_score = self._calculate_partition_score(cell, val, assignment, 'v', preference)
+            bit = 1 << val
+            h_score = 0.0  # No constraint
+            if h_state:
+                h_sum, h_filled, h_len, h_used = h_state
+                h_score = _score_partition_state(h_sum + val, h_filled + 1, h_len, h_used | bit, preference)
+            v_score = 0.0
+            if v_state:
+                v_sum, v_filled, v_len, v_used = v_state
+                v_score = _score_partition_state(v_sum + val, v_filled + 1, v_len, v_used | bit, preference)
             
             # Combined score: lower is better (fewer partitions = easier)
             # Weight by original difficulty weights too
             difficulty_weight = weights[val - 1]
             combined_score = (h_score + v_score) * (10.0 / max(difficulty_weight, 1))
             
-            candidates.append((val, combined_score))
+            # Sort key: score (lower = better), with some randomness
+            candidates.append((combined_score + random.random() * 2, val))
         
-        # Sort by score (lower = better), with some randomness
-        candidates.sort(key=lambda x: x[1] + random.random() * 2)
+        candidates.sort()
         
-        return [val for val, _ in candidates]
+        return [val for _, val in candidates]
 
 
-    def _calculate_partition_score(self, cell: Cell, value: int, assignment: Dict[Cell, int],
-                                direction: str, preference: str) -> float:
+    def _sector_state(self, cell: Cell, direction: str) -> Optional[Tuple[int, int, int, int]]:
         """
-        Calculate how "easy" this value would make the clue.
-        Returns a score where LOWER is better (fewer partitions).
+        (sum, filled count, length, used-digit mask) of the cell's sector in the
+        given direction, or None if the cell has no sector there.
         """
-        sector = cell.sector_h if direction == 'h' else cell.sector_v
-        if not sector:
-            return 0.0  # No constraint
-        
-        # Calculate current state of this sector
-        current_sum = value
-        filled_count = 1
-        remaining_cells = []
-        
-        for c in sector:
-            if c in assignment:
-                current_sum += assignment[c]
-                filled_count += 1
-            elif c != cell:
-                remaining_cells.append(c)
-        
-        sector_length = len(sector)
-        
-        # If this completes the sector, count actual partitions
-        if filled_count == sector_length:
-            num_partitions = self._count_partitions(current_sum, sector_length)
-            
-            if preference == "unique":
-                # Strongly prefer 1-2 partitions, heavily penalize >3
-                if num_partitions == 1:
-                    return 0.0  # Perfect!
-                elif num_partitions == 2:
-                    return 1.0
-                elif num_partitions <= 4:
-                    return 5.0
-                else:
-                    return 20.0  # Very bad
-                    
-            elif preference == "few":
-                # Prefer 1-4 partitions, penalize >6
-                if num_partitions <= 2:
-                    return 0.0
-                elif num_partitions <= 4:
-                    return 2.0
-                elif num_partitions <= 6:
-                    return 5.0
-                else:
-                    return 15.0
-        
+        if direction == 'h':
+            sector, s = cell.sector_h_idx, cell.sector_h_id
+            used, total, filled = self._used_h, self._sum_h, self._filled_h
         else:
-            # Sector not complete yet - estimate difficulty
-            # Calculate what range of sums are possible
-            remaining_count = len(remaining_cells)
-            
-            # Minimum possible final sum (use smallest available digits)
-            used_digits = {assignment[c] for c in sector if c in assignment}
-            used_digits.add(value)
-            available = [d for d in range(1, 10) if d not in used_digits]
-            
-            if len(available) < remaining_count:
-                return 100.0  # Impossible - will be pruned by consistency check
-            
-            min_remaining = sum(available[:remaining_count])
-            max_remaining = sum(available[-remaining_count:]) if available else 0
-            
-            min_final_sum = current_sum + min_remaining
-            max_final_sum = current_sum + max_remaining
-            
-            # Estimate average partition count in this range
-            # For efficiency, sample a few sums in the range
-            sample_sums = []
-            if min_final_sum == max_final_sum:
-                sample_sums = [min_final_sum]
-            else:
-                step = max(1, (max_final_sum - min_final_sum) // 3)
-                sample_sums = list(range(min_final_sum, max_final_sum + 1, step))
-            
-            partition_counts = [self._count_partitions(s, sector_length) for s in sample_sums]
-            avg_partitions = sum(partition_counts) / len(partition_counts) if partition_counts else 10
-            
-            # Return a "potential difficulty" score
-            if preference == "unique":
-                if avg_partitions <= 2:
-                    return 1.0
-                elif avg_partitions <= 4:
-                    return 3.0
-                else:
-                    return 8.0
-                    
-            elif preference == "few":
-                if avg_partitions <= 4:
-                    return 1.0
-                elif avg_partitions <= 6:
-                    return 3.0
-                else:
-                    return 6.0
+            sector, s = cell.sector_v_idx, cell.sector_v_id
+            used, total, filled = self._used_v, self._sum_v, self._filled_v
+        if not sector:
+            return None
         
-        return 5.0  # Default neutral score
+        return total[s], filled[s], len(sector), used[s]
 
 
-    def _count_partitions(self, target_sum: int, length: int, cache: dict = None) -> int:
+    def _count_partitions(self, target_sum: int, length: int) -> int:
         """
         Count how many ways we can partition target_sum into 'length' distinct digits (1-9).
-        Uses memoization for speed.
+        Looked up in the precomputed _PARTITION_TABLE.
         """
-        if cache is None:
-            if not hasattr(self, '_partition_cache'):
-                self._partition_cache = {}
-            cache = self._partition_cache
-        
-        key = (target_sum, length)
-        if key in cache:
-            return cache[key]
-        
-        result = self._count_partitions_recursive(target_sum, length, 1, set())
-        cache[key] = result
-        return result
-
-
-
-    def _count_partitions_recursive(self, remaining_sum: int, remaining_length: int, 
-                                    min_digit: int, used: Set[int]) -> int:
-        """Helper for counting partitions using backtracking with pruning."""
-        if remaining_length == 0:
-            return 1 if remaining_sum == 0 else 0
-        
-        if remaining_sum <= 0 or min_digit > 9:
-            return 0
-        
-        # Quick feasibility check
-        available = [d for d in range(min_digit, 10) if d not in used]
-        if len(available) < remaining_length:
-            return 0
-        
-        min_possible = sum(available[:remaining_length])
-        max_possible = sum(available[-remaining_length:])
-        
-        if remaining_sum < min_possible or remaining_sum > max_possible:
-            return 0
-        
-        count = 0
-        for digit in available:
-            used.add(digit)
-            count += self._count_partitions_recursive(remaining_sum - digit, 
-                                                    remaining_length - 1, 
-                                                    digit + 1, used)
-            used.remove(digit)
-        
-        return count
+        return _lookup_partitions(target_sum, length)
 
 
     def _generate_breaking_constraints(self, alt_sol: Dict[Tuple[int, int], int]) -> Dict[Tuple[int, int], int]:
@@ -623,25 +805,56 @@ class CSPSolver:
         # Return as constraint
         return {(target.r, target.c): new_val}
 
+    def _articulation_points(self) -> Set[Tuple[int, int]]:
+        """Cut vertices of the white-cell graph (iterative Tarjan low-link DFS)."""
+        coords = {(c.r, c.c) for c in self.board.white_cells}
+
+        def neighbors(node):
+            r, c = node
+            return iter([(r + dr, c + dc) for dr, dc in _NEIGHBOR_OFFSETS if (r + dr, c + dc) in coords])
+
+        disc: Dict[Tuple[int, int], int] = {}
+        low: Dict[Tuple[int, int], int] = {}
+        cut = set()
+        for cell in self.board.white_cells:
+            root = (cell.r, cell.c)
+            if root in disc:
+                continue
+            disc[root] = low[root] = len(disc)
+            root_children = 0
+            stack = [(root, None, neighbors(root))]
+            while stack:
+                node, parent, it = stack[-1]
+                for nxt in it:
+                    if nxt == parent:
+                        continue
+                    if nxt in disc:
+                        low[node] = min(low[node], disc[nxt])
+                    else:
+                        disc[nxt] = low[nxt] = len(disc)
+                        if node == root:
+                            root_children += 1
+                        stack.append((nxt, node, neighbors(nxt)))
+                        break
+                else:
+                    stack.pop()
+                    if parent is not None:
+                        low[parent] = min(low[parent], low[node])
+                        if parent != root and low[node] >= disc[parent]:
+                            cut.add(parent)
+            if root_children > 1:
+                cut.add(root)
+        return cut
+
     def _count_white_neighbors(self, cell: Cell) -> int:
         n = 0
-        for dr, dc in [(0,1), (0,-1), (1,0), (-1,0)]:
-            nr, nc = cell.r + dr, cell.c + dc
-            if self.board.get_cell(nr, nc) and self.board.get_cell(nr, nc).type == CellType.WHITE:
+        for dr, dc in _NEIGHBOR_OFFSETS:
+            neighbor = self.board.get_cell(cell.r + dr, cell.c + dc)
+            if neighbor and neighbor.type == CellType.WHITE:
                 n += 1
         return n
 
-    def _count_neighbors_filled(self, cell: Cell, assignment: Dict[Cell, int]) -> int:
-        count = 0
-        if cell.sector_h:
-            for n in cell.sector_h:
-                if n in assignment: count += 1
-        if cell.sector_v:
-            for n in cell.sector_v:
-                if n in assignment: count += 1
-        return count
-
-    def _is_consistent_number(self, var: Cell, value: int, assignment: Dict[Cell, int], ignore_clues: bool = False) -> bool:
+    def _is_consistent_number(self, var: Cell, value: int, values: List[int], ignore_clues: bool = False) -> bool:
         """
         Checks validity.
         If ignore_clues is True, ONLY checks for duplicate numbers in row/col.
@@ -649,40 +862,29 @@ class CSPSolver:
         """
         # --- HORIZONTAL CHECK ---
         if var.sector_h:
-            curr_sum = value
-            filled_count = 1
-            for cell in var.sector_h:
-                if cell in assignment:
-                    v = assignment[cell]
-                    if v == value: return False # Duplicate check (ALWAYS ON)
-                    curr_sum += v
-                    filled_count += 1
+            if self._used_h[var.sector_h_id] >> value & 1: return False # Duplicate check (ALWAYS ON)
             
-            # Sum check (ONLY if not ignoring clues)
+            # Sum check (ONLY if not ignoring clues): the value must belong to some
+            # set of distinct digits that completes the clue over the empty cells
             if not ignore_clues:
-                clue_cell = self.board.grid[var.sector_h[0].r][var.sector_h[0].c - 1]
-                if clue_cell.clue_h is None: return False # Should not happen in solver mode
+                clue = self._clue_h[var.sector_h_id]
+                if clue is None: return False # Should not happen in solver mode
                 
-                if curr_sum > clue_cell.clue_h: return False
-                if filled_count == len(var.sector_h) and curr_sum != clue_cell.clue_h: return False
+                remaining_sum = clue - self._sum_h[var.sector_h_id]
+                remaining_cells = len(var.sector_h) - self._filled_h[var.sector_h_id]
+                if not _combination_mask(remaining_sum, remaining_cells) >> value & 1: return False
 
         # --- VERTICAL CHECK ---
         if var.sector_v:
-            curr_sum = value
-            filled_count = 1
-            for cell in var.sector_v:
-                if cell in assignment:
-                    v = assignment[cell]
-                    if v == value: return False # Duplicate check
-                    curr_sum += v
-                    filled_count += 1
+            if self._used_v[var.sector_v_id] >> value & 1: return False # Duplicate check
             
             if not ignore_clues:
-                clue_cell = self.board.grid[var.sector_v[0].r - 1][var.sector_v[0].c]
-                if clue_cell.clue_v is None: return False
+                clue = self._clue_v[var.sector_v_id]
+                if clue is None: return False
 
-                if curr_sum > clue_cell.clue_v: return False
-                if filled_count == len(var.sector_v) and curr_sum != clue_cell.clue_v: return False
+                remaining_sum = clue - self._sum_v[var.sector_v_id]
+                remaining_cells = len(var.sector_v) - self._filled_v[var.sector_v_id]
+                if not _combination_mask(remaining_sum, remaining_cells) >> value & 1: return False
         
         return True
 
@@ -706,57 +908,96 @@ class CSPSolver:
         Returns (True, None) if unique.
         Returns (False, Alternative_Assignment) if not unique.
         """
-        current_solution = { (c.r, c.c): c.value for c in self.board.white_cells }
+        is_unique, alt_sol, _ = self._search_uniqueness(max_nodes, random_seed)
+        return is_unique, alt_sol
+
+    def _check_uniqueness_batch(self, seeds: Tuple[int, ...], max_nodes: int = 10000) -> Tuple[bool, Optional[Dict[Tuple[int, int], int]]]:
+        """
+        Runs check_uniqueness for each seed in turn and stops at the first
+        alternative solution. A search that exhausts its tree within max_nodes
+        proves uniqueness, so the remaining seeds are skipped.
+        """
+        for seed in seeds:
+            is_unique, alt_sol, exhaustive = self._search_uniqueness(max_nodes, seed)
+            if not is_unique:
+                return False, alt_sol
+            if exhaustive:
+                break
+        return True, None
+
+    def _search_uniqueness(self, max_nodes: int, random_seed: int) -> Tuple[bool, Optional[Dict[Tuple[int, int], int]], bool]:
+        """check_uniqueness plus whether the search finished within max_nodes."""
+        values = self._index_cells()
+        # The alternative must differ from this fill in at least one slot
+        target = [c.value for c in self.board.white_cells]
         
-        # Clear board to prepare for solving
-        for c in self.board.white_cells:
-            c.value = None
-            
+        # The search works on the value slots only, so the board keeps its fill
         found_solutions = []
-        self._solve_for_uniqueness(found_solutions, current_solution, [0], max_nodes, random_seed)
-        
-        # Restore original solution
-        for c in self.board.white_cells:
-            c.value = current_solution[(c.r, c.c)]
+        node_count = [0]
+        self._solve_for_uniqueness(found_solutions, target, values, node_count, max_nodes, random_seed)
             
         if not found_solutions:
             # This shouldn't happen if the puzzle was valid, but acts as a fallback
-            return True, None 
+            return True, None, node_count[0] <= max_nodes
             
         # found_solutions contains the ALTERNATIVE solution
-        return False, found_solutions[0]
+        return False, found_solutions[0], False
 
-    def _solve_for_uniqueness(self, found_solutions: List[Dict], avoid_sol: Dict, node_count: List[int], max_nodes: int, random_seed: int):
-        if found_solutions or node_count[0] > max_nodes: return
-        node_count[0] += 1
-        unassigned = [c for c in self.board.white_cells if c.value is None]
-        if not unassigned:
-            for c in self.board.white_cells:
-                if avoid_sol.get((c.r, c.c)) != c.value:
-                    found_solutions.append({(cell.r, cell.c): cell.value for cell in self.board.white_cells})
+    def _solve_for_uniqueness(self, found_solutions: List[Dict], target: List[Optional[int]], current_assign: List[int],
+                              node_count: List[int], max_nodes: int, random_seed: int):
+        """
+        Depth-first search for a clue-respecting fill that differs from `target`.
+        Iterative: each stack frame holds a node's variable, its candidate mask,
+        its shuffled value order, the next position in that order, and whether
+        the path to the node already diverged. _assign/_unassign serve as the
+        O(1) undo trail.
+        """
+        cells = self.board.white_cells
+        stack = []
+        diverged = False
+        while True:
+            # --- Enter a node ---
+            if node_count[0] > max_nodes: return
+            node_count[0] += 1
+            
+            # MRV on domain size respecting CLUES, read as a bitmask from the sector state
+            var, var_mask, best = None, 0, 10
+            for c in cells:
+                if current_assign[c.idx]: continue
+                mask = self._candidate_mask(c)
+                size = mask.bit_count()
+                if size < best:
+                    var, var_mask, best = c, mask, size
+                    if size == 0: break # Dead end, nothing smaller to find
+            
+            if var is None:
+                # diverged is set once any assigned value differs from the target fill
+                if diverged:
+                    found_solutions.append({(c.r, c.c): current_assign[c.idx] for c in cells})
                     return
-            return
-        
-        # Helper to get domain size respecting CLUES
-        def get_d_size(c):
-            cnt = 0
-            for v in range(1, 10):
-                if self._is_consistent_number(c, v, {x: x.value for x in self.board.white_cells if x.value}, ignore_clues=False): cnt += 1
-            return cnt
-
-        var = min(unassigned, key=lambda c: get_d_size(c))
-        values = list(range(1, 10))
-        random.Random(random_seed + node_count[0]).shuffle(values)
-        
-        # Current partial assignment for validation
-        current_assign = {x: x.value for x in self.board.white_cells if x.value is not None}
-        
-        for val in values:
-            if self._is_consistent_number(var, val, current_assign, ignore_clues=False):
-                var.value = val
-                self._solve_for_uniqueness(found_solutions, avoid_sol, node_count, max_nodes, random_seed)
-                if found_solutions: return
-                var.value = None
+            else:
+                order = list(range(1, 10))
+                random.Random(random_seed + node_count[0]).shuffle(order)
+                stack.append([var, var_mask, order, 0, diverged])
+            
+            # --- Move to the next untried child, backtracking as needed ---
+            while stack:
+                frame = stack[-1]
+                var, var_mask, order, pos, node_diverged = frame
+                if current_assign[var.idx]:
+                    self._unassign(var, current_assign) # Back from a child
+                while pos < 9 and not var_mask >> order[pos] & 1:
+                    pos += 1
+                if pos == 9:
+                    stack.pop()
+                    continue
+                frame[3] = pos + 1
+                val = order[pos]
+                self._assign(var, val, current_assign)
+                diverged = node_diverged or val != target[var.idx]
+                break
+            else:
+                return
 
     def _get_domain_size(self, cell: Cell) -> int:
         c = 0
@@ -0,0 +1,50 @@
+"""
+Running totals over the puzzle template pool (see models.TemplateStat).
+The admin overview reads one row here instead of aggregating puzzle_templates.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func, update
+from datetime import datetime, timedelta, timezone
+from .models import PuzzleTemplate, TemplateStat
+
+STATS_ID = 1
+# Recompute from puzzle_templates when the row is older than this
+MAX_AGE = timedelta(hours=1)
+
+def bump(db: Session, uses: int = 0, skips: int = 0, templates: int = 0):
+    """Adds to the template/use/skip totals as part of the caller's transaction."""
+    db.execute(
+        update(TemplateStat)
+        .where(TemplateStat.id == STATS_ID)
+        .values(
+            templates=TemplateStat.templates + templates,
+            total_uses=TemplateStat.total_uses + uses,
+            total_skips=TemplateStat.total_skips + skips
+        )
+    )
+
+def refresh(db: Session) -> TemplateStat:
+    """Recomputes the totals from puzzle_templates, correcting any drift in the bumped counters."""
+    templates, total_uses, total_skips = db.query(
+        func.count(PuzzleTemplate.id),
+        func.coalesce(func.sum(PuzzleTemplate.times_used), 0),
+        func.coalesce(func.sum(PuzzleTemplate.times_skipped), 0)
+    ).one()
+
+    stat = db.get(TemplateStat, STATS_ID)
+    if stat is None:
+        stat = TemplateStat(id=STATS_ID)
+        db.add(stat)
+    stat.templates = templates
+    stat.total_uses = total_uses
+    stat.total_skips = total_skips
+    stat.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    return stat
+
+def get(db: Session) -> TemplateStat:
+    """The current totals, recomputed first if missing or older than MAX_AGE."""
+    stat = db.get(TemplateStat, STATS_ID)
+    if stat is None or stat.updated_at.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc) - MAX_AGE:
+        return refresh(db)
+    return stat
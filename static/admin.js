@@ -114,7 +114,7 @@ async function refreshData(forceSection = null) {
     if (activeSection.includes('puzzles')) {
         const data = await adminFetch('/admin/stats/puzzles');
         if (!data) return;
-        updatePuzzlesTable(data);
+        updatePuzzlesTable(data.puzzles);
     }
 
     if (activeSection.includes('logs')) {
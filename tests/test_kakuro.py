@@ -1,6 +1,7 @@
+import itertools
 import unittest
 from python.kakuro import KakuroBoard, CellType
-from python.solver import CSPSolver
+from python.solver import CSPSolver, _combination_mask
 
 class TestKakuro(unittest.TestCase):
     def test_topology(self):
@@ -40,5 +41,39 @@ class TestKakuro(unittest.TestCase):
                         clues += 1
         self.assertTrue(clues > 0, "Should have generated clues")
 
+    def test_articulation_points(self):
+        board = KakuroBoard(7, 7)
+        board._reset_grid()
+        # Two 2x2 blocks joined by a one-cell corridor at (2, 3)
+        for r, c in [(1, 1), (1, 2), (2, 1), (2, 2), (2, 3), (2, 4), (2, 5), (1, 4), (1, 5)]:
+            board.grid[r][c].type = CellType.WHITE
+        board._collect_white_cells()
+        self.assertEqual(CSPSolver(board)._articulation_points(), {(2, 2), (2, 3), (2, 4)})
+
+    def test_partition_counts(self):
+        solver = CSPSolver(KakuroBoard(5, 5))
+        for length in range(1, 10):
+            for total in range(0, 47):
+                expected = sum(1 for p in itertools.combinations(range(1, 10), length) if sum(p) == total)
+                self.assertEqual(solver._count_partitions(total, length), expected, (total, length))
+        self.assertEqual(solver._count_partitions(-3, 2), 0)
+
+    def test_combination_masks(self):
+        for length in range(1, 10):
+            for total in range(0, 47):
+                expected = 0
+                for p in itertools.combinations(range(1, 10), length):
+                    if sum(p) == total:
+                        for d in p:
+                            expected |= 1 << d
+                self.assertEqual(_combination_mask(total, length), expected, (total, length))
+        self.assertEqual(_combination_mask(17, 2), 1 << 8 | 1 << 9)
+        self.assertEqual(_combination_mask(-1, 1), 0)
+
+    def test_generate_puzzle_stops_when_cancelled(self):
+        solver = CSPSolver(KakuroBoard(10, 10))
+        solver.should_stop = lambda: True
+        self.assertFalse(solver.generate_puzzle("easy"))
+
 if __name__ == '__main__':
     unittest.main()
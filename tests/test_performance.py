@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from python.database import Base
+from python.models import PerformanceMetric, PerformanceMetricRollup, AuthLog, PuzzleTemplate
+import python.performance as performance
+
+
+class TestMetricBuffer(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.Session = sessionmaker(bind=engine)
+        performance._METRIC_BUFFER.clear()
+        performance._AUTH_BUFFER.clear()
+
+    def test_record_metric_is_buffered_until_flush(self):
+        with self.Session() as db:
+            performance.record_metric(db, "test_metric", 1.5, "ms")
+            performance.record_metric(db, "test_metric", 2.5, "ms", metadata={"path": "/x"})
+            self.assertEqual(db.query(PerformanceMetric).count(), 0)
+
+            written = performance.flush_metrics(db)
+            self.assertEqual(written, 2)
+            rows = db.query(PerformanceMetric).order_by(PerformanceMetric.value).all()
+            self.assertEqual([r.value for r in rows], [1.5, 2.5])
+            self.assertEqual(rows[1].metadata_json["path"], "/x")
+            self.assertEqual(rows[1].metadata_json["user_type"], "anonymous")
+
+    def test_record_metrics_bulk(self):
+        rows = [performance.metric_row(f"skip_rate_{d}", 10.0, "%", {"difficulty": d}) for d in ("easy", "hard")]
+        with self.Session() as db:
+            performance.record_metrics_bulk(db, rows)
+            names = {m.metric_name for m in db.query(PerformanceMetric).all()}
+            self.assertEqual(names, {"skip_rate_easy", "skip_rate_hard"})
+
+    def test_auth_log_is_flushed(self):
+        request = SimpleNamespace(client=SimpleNamespace(host="127.0.0.1"), headers={"user-agent": "test"})
+        with self.Session() as db:
+            performance.log_auth_attempt(db, "a@b.c", "LOGIN", "FAILED", request, reason="Invalid password")
+            performance.flush_metrics(db)
+            log = db.query(AuthLog).one()
+            self.assertEqual((log.email, log.ip_address, log.reason), ("a@b.c", "127.0.0.1", "Invalid password"))
+
+    def test_auth_backlog_wakes_flusher(self):
+        request = SimpleNamespace(client=SimpleNamespace(host="127.0.0.1"), headers={})
+        performance._FLUSH_EVENT.clear()
+        for _ in range(performance.AUTH_FLUSH_THRESHOLD_ROWS - 1):
+            performance.log_auth_attempt(None, "a@b.c", "LOGIN", "FAILED", request)
+        self.assertFalse(performance._FLUSH_EVENT.is_set())
+        performance.log_auth_attempt(None, "a@b.c", "LOGIN", "FAILED", request)
+        self.assertTrue(performance._FLUSH_EVENT.is_set())
+        performance._FLUSH_EVENT.clear()
+
+    def test_quality_metrics(self):
+        with self.Session() as db:
+            for diff, used, skipped in (("easy", 8, 2), ("easy", 2, 0), ("hard", 10, 8)):
+                db.add(PuzzleTemplate(width=5, height=5, difficulty=diff, difficulty_score=0.0,
+                                      difficulty_data={}, grid=[], times_used=used, times_skipped=skipped))
+            db.commit()
+
+            avg_uses = performance.log_puzzle_quality_metrics(db)
+            self.assertAlmostEqual(avg_uses, 20 / 3)
+            values = {m.metric_name: m.value for m in db.query(PerformanceMetric).all()}
+            self.assertAlmostEqual(values["aggregate_skip_rate"], 50.0)
+            self.assertAlmostEqual(values["total_puzzle_uses"], 20.0)
+            self.assertAlmostEqual(values["skip_rate_easy"], 20.0)
+            self.assertAlmostEqual(values["skip_rate_hard"], 80.0)
+
+    def test_timer_is_buffered(self):
+        with self.Session() as db:
+            with performance.Timer(db, "timed_block", metadata={"path": "/t"}):
+                pass
+            self.assertEqual(db.query(PerformanceMetric).count(), 0)
+            performance.flush_metrics(db)
+            metric = db.query(PerformanceMetric).one()
+            self.assertEqual((metric.metric_name, metric.unit, metric.path), ("timed_block", "ms", "/t"))
+
+    def test_flush_updates_rollups(self):
+        with self.Session() as db:
+            for value in (10.0, 20.0):
+                performance.record_metric(db, "system_cpu_percent", value, "%")
+            performance.flush_metrics(db)
+            performance.record_metric(db, "system_cpu_percent", 60.0, "%")
+            performance.record_metric(db, "api_request_duration_ms", 5.0, "ms")
+            performance.flush_metrics(db)
+
+            rollups = db.query(PerformanceMetricRollup).all()
+            self.assertEqual(sum(r.count for r in rollups), 3)
+            self.assertAlmostEqual(sum(r.sum for r in rollups), 90.0)
+            self.assertEqual({r.metric_name for r in rollups}, {"system_cpu_percent"})
+
+    def test_failed_flush_requeues_batch(self):
+        request = SimpleNamespace(client=SimpleNamespace(host="127.0.0.1"), headers={})
+        with self.Session() as db:
+            performance.record_metric(db, "test_metric", 1.0, "ms")
+            performance.record_metric(db, "test_metric", 2.0, "ms")
+            performance.log_auth_attempt(db, "a@b.c", "LOGIN", "FAILED", request)
+
+            with mock.patch.object(performance, "_insert_metrics", side_effect=RuntimeError("db down")):
+                self.assertEqual(performance.flush_metrics(db), 1)
+            self.assertEqual(db.query(AuthLog).count(), 1)
+            self.assertEqual([r["value"] for r in performance._METRIC_BUFFER], [1.0, 2.0])
+
+            self.assertEqual(performance.flush_metrics(db), 2)
+            self.assertEqual(db.query(PerformanceMetric).count(), 2)
+
+    def test_flush_empty_buffer(self):
+        with self.Session() as db:
+            self.assertEqual(performance.flush_metrics(db), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()